@@ -1,12 +1,19 @@
+import asyncio
+import hashlib
 import json
+from datetime import date, timedelta
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse, RedirectResponse, Response
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from settings import APP_SECRET, HAS_KEY, OpenAI, ONBOARDING
+from settings import (
+    APP_SECRET, HAS_KEY, OpenAI, ONBOARDING, REPORT_CACHE_SIZE,
+    COACH_WS_MAX, COACH_WS_IDLE_S, COACH_WS_MAX_MESSAGE, GRADER_MODEL,
+)
 from auth import is_logged_in, require_login, check_credentials, is_admin
 from pages import (
     build_login_html,
@@ -19,10 +26,36 @@ from pages import (
     build_exam_report_html,
     build_onboarding_html,
 )
-from prompts import build_customer_instructions
-from evaluation import coach_tips, grade_exam, evaluate_checklist
-from openai_realtime import webrtc_answer_sdp
-from storage import save_attempt, list_attempts, get_attempt
+from prompts import build_customer_instructions, get_scenario, pick_scenario
+from evaluation import coach_tips, coach_metrics, coach_session
+from governor import Saturated, saturated, governor_metrics, GRADE
+from jobs import (
+    start_evaluation, start_jobs, stop_jobs, reevaluate, on_finished, subscribe, unsubscribe, running_metrics,
+)
+from openai_realtime import webrtc_answer_sdp, open_pool, close_pool, sdp_metrics, server_timing_header
+from storage import (
+    init_db,
+    asave_attempt,
+    stop_writer,
+    write_metrics,
+    list_attempts,
+    get_attempt,
+    REPORT_FIELDS,
+    create_call,
+    get_call,
+    append_turns,
+    list_turns,
+    render_transcript,
+    TURN_ROLES,
+    trainee_stats,
+    daily_stats,
+    search_attempts,
+    SEARCH_MAX_OFFSET,
+    iter_attempts,
+    list_evaluation_runs,
+)
+from export import ndjson_lines, csv_lines
+from cache import LRUCache
 
 app = FastAPI()
 app.add_middleware(SessionMiddleware, secret_key=APP_SECRET, same_site="lax", https_only=False)
@@ -36,6 +69,21 @@ STATIC_DIR.mkdir(exist_ok=True)  # avoids crash if folder missing
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
+@app.on_event("startup")
+async def _startup():
+    init_db()
+    if HAS_KEY:
+        await open_pool()
+        await start_jobs()
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await stop_jobs()
+    stop_writer()
+    await close_pool()
+
+
 @app.get("/favicon.ico")
 def favicon():
     return Response(status_code=204)
@@ -94,6 +142,107 @@ def _ensure_attempt_id(maybe_id):
     return None
 
 
+# -------------------------
+# Report cache (attempt dicts + rendered bodies, keyed by attempt id)
+# -------------------------
+_attempt_cache = LRUCache(REPORT_CACHE_SIZE)
+_report_cache = LRUCache(REPORT_CACHE_SIZE)
+
+
+def _is_final(a: dict) -> bool:
+    # Only evaluated attempts are immutable; pending/error ones may be finished (or re-run)
+    # by any worker process, which this process's cache would never hear about.
+    return (a.get("status") or "done") == "done"
+
+
+def _cached_attempt(attempt_id: int):
+    a = _attempt_cache.get(attempt_id)
+    if a is None:
+        a = get_attempt(attempt_id, fields=REPORT_FIELDS)
+        if a and _is_final(a):
+            _attempt_cache.set(attempt_id, a)
+    return a
+
+
+def _cached_body(key, render, store: bool = True):
+    """Returns (body, strong ETag) for key, rendering once per cache lifetime (store=False: render only)."""
+    hit = _report_cache.get(key) if store else None
+    if hit is None:
+        body = render()
+        etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+        hit = (body, etag)
+        if store:
+            _report_cache.set(key, hit)
+    return hit
+
+
+def invalidate_attempt(attempt_id: int):
+    _attempt_cache.pop(attempt_id)
+    for kind in ("training", "exam", "admin"):
+        _report_cache.pop((kind, attempt_id))
+
+
+on_finished(invalidate_attempt)  # pending -> done/error changes the rendered report
+
+
+def _etag_response(request: Request, body: str, etag: str, media_type: str) -> Response:
+    # no-cache: browsers and the proxy may store the body but must revalidate (auth runs every time)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Cookie"}
+    inm = request.headers.get("if-none-match") or ""
+    if inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
+
+MAX_TURNS_PER_REQUEST = 200
+MAX_TURN_CHARS = 4000
+
+
+# _owned_call and _finish_transcript hit SQLite: async handlers run them via asyncio.to_thread
+def _owned_call(request: Request, call_id: str):
+    call = get_call(call_id) if call_id else None
+    if not call or call.get("user_email") != _me(request):
+        return None
+    return call
+
+
+def _finish_transcript(request: Request, data: dict):
+    """
+    Finish payload is {call_id} (turns were streamed during the call) or a legacy {transcript}.
+    Returns (transcript, call) — call is None for the legacy path. Raises LookupError for unknown calls.
+    """
+    call_id = (data.get("call_id") or "").strip()
+    if not call_id:
+        return (data.get("transcript") or "").strip(), None
+    call = _owned_call(request, call_id)
+    if not call:
+        raise LookupError(call_id)
+    return render_transcript(list_turns(call_id)), call
+
+
+def _attempt_filters_from_query(request: Request) -> dict:
+    """Admin list/export filters: user_email, mode, level, result=pass|fail, from/to (dates inclusive)."""
+    q = request.query_params
+    result = (q.get("result") or "").strip().lower()
+    passed = True if result in {"pass", "passed", "1"} else (False if result in {"fail", "failed", "0"} else None)
+
+    created_before = (q.get("to") or "").strip() or None
+    if created_before and len(created_before) == 10:
+        try:
+            created_before = (date.fromisoformat(created_before) + timedelta(days=1)).isoformat()
+        except ValueError:
+            pass
+
+    return {
+        "user_email": (q.get("user_email") or "").strip().lower() or None,
+        "mode": (q.get("mode") or "").strip().lower() or None,
+        "level": (q.get("level") or "").strip().lower() or None,
+        "passed": passed,
+        "created_from": (q.get("from") or "").strip() or None,
+        "created_before": created_before,
+    }
+
+
 def _onboarding_done(request: Request) -> bool:
     return bool(request.session.get("onboarding_done"))
 
@@ -265,7 +414,7 @@ def training_report(request: Request, attempt_id: int):
     if redirect:
         return redirect
 
-    a = get_attempt(attempt_id)
+    a = _cached_attempt(attempt_id)
     if not a:
         return HTMLResponse("Not found", status_code=404)
     if not _can_view_attempt(request, a):
@@ -273,7 +422,89 @@ def training_report(request: Request, attempt_id: int):
     if (a.get("mode") or "") != "training":
         return HTMLResponse("Not a training attempt", status_code=400)
 
-    return HTMLResponse(build_training_report_html(a))
+    body, etag = _cached_body(("training", attempt_id), lambda: build_training_report_html(a), _is_final(a))
+    return _etag_response(request, body, etag, "text/html; charset=utf-8")
+
+
+# -------------------------
+# Report progress (Server-Sent Events) for pending attempts
+# -------------------------
+SSE_PING_S = 15.0
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/attempt/{attempt_id}/events")
+async def attempt_events(request: Request, attempt_id: int):
+    redirect = require_login(request)
+    if redirect:
+        return JSONResponse({"detail": "Not logged in"}, status_code=401)
+    a = _cached_attempt(attempt_id)
+    if not a:
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+    if not _can_view_attempt(request, a):
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+
+    def stored_status() -> str:
+        return (get_attempt(attempt_id, fields=("status",)) or {}).get("status") or "done"
+
+    async def stream():
+        q = subscribe(attempt_id)  # before reading the status, so no event is missed
+        try:
+            status = await asyncio.to_thread(stored_status)
+            if status != "pending":
+                yield _sse(status, {"status": status})
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(q.get(), timeout=SSE_PING_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    status = await asyncio.to_thread(stored_status)  # e.g. finished by another worker process
+                    if status != "pending":
+                        yield _sse(status, {"status": status})
+                        return
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(event, data)
+                if event in ("done", "error"):
+                    return
+        finally:
+            unsubscribe(attempt_id, q)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/attempt/{attempt_id}/reevaluate")
+async def attempt_reevaluate(request: Request, attempt_id: int):
+    """Re-runs a failed evaluation; the report page then streams progress as usual."""
+    redirect = require_login(request)
+    if redirect:
+        return JSONResponse({"detail": "Not logged in"}, status_code=401)
+    guard = require_openai_key_json()
+    if guard:
+        return guard
+    a = await asyncio.to_thread(get_attempt, attempt_id, fields=("id", "user_email", "mode", "status"))
+    if not a:
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+    if not _can_view_attempt(request, a):
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+    if (a.get("status") or "") != "error":
+        return JSONResponse({"detail": "Only a failed evaluation can be re-run"}, status_code=409)
+    busy = _grader_busy()
+    if busy:
+        return busy
+    if not await reevaluate(attempt_id):
+        return JSONResponse({"detail": "Only a failed evaluation can be re-run"}, status_code=409)
+    invalidate_attempt(attempt_id)
+    return JSONResponse({"ok": True, "attempt_id": attempt_id, "status": "pending"})
 
 
 # -------------------------
@@ -295,7 +526,7 @@ def exam_report(request: Request, attempt_id: int):
     if redirect:
         return redirect
 
-    a = get_attempt(attempt_id)
+    a = _cached_attempt(attempt_id)
     if not a:
         return HTMLResponse("Not found", status_code=404)
     if not _can_view_attempt(request, a):
@@ -303,7 +534,8 @@ def exam_report(request: Request, attempt_id: int):
     if (a.get("mode") or "") != "exam":
         return HTMLResponse("Not an exam attempt", status_code=400)
 
-    return HTMLResponse(build_exam_report_html(a))
+    body, etag = _cached_body(("exam", attempt_id), lambda: build_exam_report_html(a), _is_final(a))
+    return _etag_response(request, body, etag, "text/html; charset=utf-8")
 
 
 # -------------------------
@@ -325,12 +557,71 @@ async def session_endpoint(request: Request):
 
     level = (request.query_params.get("level") or "easy").strip().lower()
     scenario_id = (request.query_params.get("scenario_id") or "").strip()
+    # Resolve the scenario here so the call record and the coach's script rules agree
+    scenario_id = (get_scenario(level, scenario_id) if scenario_id else pick_scenario(level))["id"]
 
     instructions = build_customer_instructions(level, scenario_id=scenario_id)
 
     try:
-        answer_sdp = webrtc_answer_sdp(offer_sdp, instructions)
-        return PlainTextResponse(answer_sdp, media_type="application/sdp")
+        answer_sdp, timings = await webrtc_answer_sdp(offer_sdp, instructions)
+        call_id = await asyncio.to_thread(create_call, _me(request), level, scenario_id=scenario_id)
+        return PlainTextResponse(
+            answer_sdp,
+            media_type="application/sdp",
+            headers={"Server-Timing": server_timing_header(timings), "X-Call-Id": call_id, "X-Scenario-Id": scenario_id},
+        )
+    except Exception as e:
+        return JSONResponse({"detail": str(e)}, status_code=500)
+
+
+def _busy(e: Saturated) -> JSONResponse:
+    return JSONResponse({"detail": str(e)}, status_code=429, headers={"Retry-After": e.retry_after_header})
+
+
+def _grader_busy() -> Optional[JSONResponse]:
+    """429 when a new evaluation could not get a grader slot in time (checked before saving)."""
+    retry = saturated(GRADER_MODEL, GRADE)
+    return _busy(Saturated(GRADER_MODEL, retry)) if retry is not None else None
+
+
+# -------------------------
+# Call turns (streamed by the live page as each turn is finalized)
+# -------------------------
+def _parse_turns(raw: Any) -> List[Dict[str, Any]]:
+    turns = []
+    for t in (raw if isinstance(raw, list) else [])[:MAX_TURNS_PER_REQUEST]:
+        if not isinstance(t, dict):
+            continue
+        role = str(t.get("role") or "").strip().upper()
+        text = str(t.get("text") or "").strip()[:MAX_TURN_CHARS]
+        try:
+            seq = int(t.get("seq"))
+        except (TypeError, ValueError):
+            continue
+        if role not in TURN_ROLES or not text or seq < 0:
+            continue
+        turns.append({"seq": seq, "role": role, "text": text, "spoken_at": str(t.get("at") or "")[:40] or None})
+    return turns
+
+
+@app.post("/calls/{call_id}/turns")
+async def call_turns_endpoint(request: Request, call_id: str):
+    redirect = require_login(request)
+    if redirect:
+        return JSONResponse({"detail": "Not logged in"}, status_code=401)
+
+    call = await asyncio.to_thread(_owned_call, request, call_id)
+    if not call:
+        return JSONResponse({"detail": "Unknown call"}, status_code=404)
+    if call.get("attempt_id"):
+        return JSONResponse({"detail": "Call already finished"}, status_code=409)
+
+    data = await request.json()
+    turns = _parse_turns(data.get("turns"))
+
+    try:
+        ack_seq = await asyncio.to_thread(append_turns, call_id, turns)
+        return JSONResponse({"ok": True, "ack_seq": ack_seq})
     except Exception as e:
         return JSONResponse({"detail": str(e)}, status_code=500)
 
@@ -344,19 +635,132 @@ async def coach_endpoint(request: Request):
     if redirect:
         return JSONResponse({"detail": "Not logged in"}, status_code=401)
 
-    guard = require_openai_key_json()
-    if guard:
-        return guard
-
+    # No key check here: local tips need no model, and coach_tips answers "missing_key"
+    # itself when a model call would be needed.
     data = await request.json()
     transcript = (data.get("transcript") or "").strip()
+    call_id = (data.get("call_id") or "").strip()
+    session = None
+    if call_id:
+        # Same rules as /coach/ws: only the caller's own calls, with the scenario stored at /session
+        call = await asyncio.to_thread(_owned_call, request, call_id)
+        if not call:
+            return JSONResponse({"detail": "Unknown call"}, status_code=404)
+        session = coach_session((_me(request), call_id), scenario_id=call.get("scenario_id") or "")
+
+    # Delta mode: {"turns": [...]} carries only turns after the last ack_seq the page got
+    if session is not None and "turns" in data:
+        if isinstance(data.get("shown_tags"), list):
+            session.sync_delivered(data["shown_tags"])
+        if not session.apply_turns(_parse_turns(data.get("turns"))):
+            return JSONResponse({"resync": True, "ack_seq": session.seq})
+        transcript = None
 
     try:
-        return JSONResponse(coach_tips(transcript))
+        out = await coach_tips(transcript, session=session)
+        if session is not None:
+            out["ack_seq"] = session.seq
+        return JSONResponse(out)
+    except Saturated as e:
+        return _busy(e)
     except Exception as e:
         return JSONResponse({"detail": str(e)}, status_code=500)
 
 
+# -------------------------
+# Live coach over WebSocket: the page streams turn deltas, the server pushes tips
+#   page -> {"type": "turns", "turns": [...], "shown_tags": [...]} | {"type": "ping"} (keepalive, every 30s)
+#   server -> {"type": "ack"|"resync", "ack_seq": n} | {"type": "tip", ...coach fields, "ack_seq": n}
+# A tip is computed only when the next missing step changes; a newer step cancels the
+# computation for the older one. /coach stays as the HTTP fallback.
+# -------------------------
+_coach_sockets: Dict[tuple, WebSocket] = {}
+_ws_stats = {"opened": 0, "rejected": 0, "replaced": 0, "idle_closed": 0, "tips_pushed": 0}
+
+
+async def _push_tip(ws: WebSocket, session):
+    try:
+        out = await coach_tips(None, session=session)
+        if out.get("should_intervene"):
+            _ws_stats["tips_pushed"] += 1
+            await ws.send_json({"type": "tip", **out, "ack_seq": session.seq})
+    except Exception:
+        pass  # model error or socket gone; the next step change tries again
+
+
+@app.websocket("/coach/ws")
+async def coach_ws(ws: WebSocket):
+    me = _me(ws)
+    call_id = (ws.query_params.get("call_id") or "").strip()
+    call = await asyncio.to_thread(_owned_call, ws, call_id) if me else None
+    if not call:
+        await ws.close(code=1008)
+        return
+    key = (me, call_id)
+    if key not in _coach_sockets and len(_coach_sockets) >= COACH_WS_MAX:
+        _ws_stats["rejected"] += 1
+        await ws.close(code=1013)  # try again later; the page falls back to HTTP
+        return
+
+    await ws.accept()
+    old = _coach_sockets.get(key)
+    _coach_sockets[key] = ws
+    _ws_stats["opened"] += 1
+    if old is not None:
+        _ws_stats["replaced"] += 1
+        try:
+            await old.close(code=4001)  # replaced: the old page must not reconnect
+        except Exception:
+            pass
+
+    session = coach_session(key, scenario_id=call.get("scenario_id") or "")
+    last_step = object()  # sentinel: first turns always evaluate
+    pending: Optional[asyncio.Task] = None
+    try:
+        while True:
+            try:
+                raw = await asyncio.wait_for(ws.receive_text(), timeout=COACH_WS_IDLE_S)
+            except asyncio.TimeoutError:
+                _ws_stats["idle_closed"] += 1
+                await ws.close(code=1000)
+                return
+            if len(raw) > COACH_WS_MAX_MESSAGE:
+                await ws.close(code=1009)
+                return
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+            if not isinstance(msg, dict) or msg.get("type") != "turns":
+                continue
+
+            if isinstance(msg.get("shown_tags"), list):
+                session.sync_delivered(msg["shown_tags"])
+            if not session.apply_turns(_parse_turns(msg.get("turns"))):
+                await ws.send_json({"type": "resync", "ack_seq": session.seq})
+                continue
+            await ws.send_json({"type": "ack", "ack_seq": session.seq})
+
+            step = session.next_step()
+            if step == last_step:
+                continue
+            last_step = step
+            if pending is not None and not pending.done():
+                pending.cancel()
+            pending = asyncio.create_task(_push_tip(ws, session))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+        if _coach_sockets.get(key) is ws:
+            _coach_sockets.pop(key, None)
+
+
+def coach_ws_metrics() -> Dict[str, Any]:
+    return {**_ws_stats, "open": len(_coach_sockets), "max": COACH_WS_MAX}
+
+
 # -------------------------
 # Training after-call -> returns attempt_id for redirect
 # -------------------------
@@ -367,32 +771,45 @@ async def aftercall_endpoint(request: Request):
         return JSONResponse({"detail": "Not logged in"}, status_code=401)
 
     data = await request.json()
-    transcript = (data.get("transcript") or "").strip()
     level = (data.get("level") or "easy").strip().lower()
     user_email = _me(request)
 
+    # Refuse before the call is finalized so the page can retry the same request
+    busy = _grader_busy() if HAS_KEY and OpenAI is not None else None
+    if busy:
+        return busy
+
+    try:
+        transcript, call = await asyncio.to_thread(_finish_transcript, request, data)
+    except LookupError:
+        return JSONResponse({"detail": "Unknown call"}, status_code=404)
+    if call and call.get("attempt_id"):
+        return JSONResponse({"ok": True, "attempt_id": call["attempt_id"]})
+    call_id = call["call_id"] if call else None
+
     if not HAS_KEY or OpenAI is None:
-        maybe_id = save_attempt({
+        maybe_id = await asave_attempt({
             "user_email": user_email,
             "mode": "training",
             "level": level,
-            "transcript": transcript,
+            "transcript": "" if call_id else transcript,
+            "call_id": call_id,
         })
         attempt_id = _ensure_attempt_id(maybe_id)
         return JSONResponse({"ok": True, "attempt_id": attempt_id})
 
-    report = evaluate_checklist(transcript)
-
-    maybe_id = save_attempt({
+    # Saved as pending; the report page streams the checklist in (/attempt/{id}/events)
+    maybe_id = await asave_attempt({
         "user_email": user_email,
         "mode": "training",
         "level": level,
-        "transcript": transcript,
-        "checklist_score": int(report.get("checklist_score", 0) or 0),
-        "checklist_json": json.dumps(report, ensure_ascii=False),
+        "transcript": "" if call_id else transcript,
+        "call_id": call_id,
+        "status": "pending",
     })
     attempt_id = _ensure_attempt_id(maybe_id)
-    return JSONResponse({"ok": True, "attempt_id": attempt_id})
+    start_evaluation(attempt_id, "training", transcript)
+    return JSONResponse({"ok": True, "attempt_id": attempt_id, "status": "pending"})
 
 
 # -------------------------
@@ -409,28 +826,33 @@ async def grade_endpoint(request: Request):
         return guard
 
     data = await request.json()
-    transcript = (data.get("transcript") or "").strip()
     level = (data.get("level") or request.query_params.get("level") or "easy").strip().lower()
     user_email = _me(request)
 
-    result = grade_exam(transcript)
-    checklist = evaluate_checklist(transcript)
+    busy = _grader_busy()
+    if busy:
+        return busy
 
-    maybe_id = save_attempt({
+    try:
+        transcript, call = await asyncio.to_thread(_finish_transcript, request, data)
+    except LookupError:
+        return JSONResponse({"detail": "Unknown call"}, status_code=404)
+    if call and call.get("attempt_id"):
+        return JSONResponse({"ok": True, "attempt_id": call["attempt_id"]})
+    call_id = call["call_id"] if call else None
+
+    # Saved as pending; grading runs in the background (jobs.py, bounded by GRADE_DEADLINE_S)
+    maybe_id = await asave_attempt({
         "user_email": user_email,
         "mode": "exam",
         "level": level,
-        "transcript": transcript,
-        "score": int(result.get("score", 0) or 0),
-        "passed": 1 if result.get("pass") else 0,
-        "summary": result.get("summary", ""),
-        "strengths": json.dumps(result.get("strengths", []), ensure_ascii=False),
-        "improvements": json.dumps(result.get("improvements", []), ensure_ascii=False),
-        "checklist_score": int(checklist.get("checklist_score", 0) or 0),
-        "checklist_json": json.dumps(checklist, ensure_ascii=False),
+        "transcript": "" if call_id else transcript,
+        "call_id": call_id,
+        "status": "pending",
     })
     attempt_id = _ensure_attempt_id(maybe_id)
-    return JSONResponse({"ok": True, "attempt_id": attempt_id})
+    start_evaluation(attempt_id, "exam", transcript)
+    return JSONResponse({"ok": True, "attempt_id": attempt_id, "status": "pending"})
 
 
 # -------------------------
@@ -449,7 +871,103 @@ def admin_attempts(request: Request):
     guard = require_admin(request)
     if guard:
         return guard
-    return JSONResponse({"items": list_attempts(limit=300)})
+
+    q = request.query_params
+    try:
+        limit = max(1, min(500, int(q.get("limit") or 100)))
+        cursor = int(q["cursor"]) if q.get("cursor") else None
+    except ValueError:
+        return JSONResponse({"detail": "Bad limit or cursor"}, status_code=400)
+
+    items = list_attempts(limit=limit, cursor=cursor, **_attempt_filters_from_query(request))
+    next_cursor = items[-1]["id"] if len(items) == limit else None
+    return JSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+@app.get("/admin/api/export")
+def admin_export(request: Request):
+    """Streams every matching attempt as NDJSON (default) or CSV; memory stays flat."""
+    guard = require_admin(request)
+    if guard:
+        return guard
+    q = request.query_params
+    fmt = (q.get("format") or "ndjson").strip().lower()
+    if fmt not in {"ndjson", "csv"}:
+        return JSONResponse({"detail": "format must be ndjson or csv"}, status_code=400)
+    include_items = (q.get("items") or "").strip().lower() in {"1", "true", "yes"}
+    include_transcript = (q.get("transcript") or "").strip().lower() in {"1", "true", "yes"}
+
+    rows = iter_attempts(include_transcript=include_transcript, **_attempt_filters_from_query(request))
+    if fmt == "csv":
+        body = csv_lines(rows, include_items=include_items, include_transcript=include_transcript)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        body = ndjson_lines(rows, include_items=include_items)
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="attempts.{fmt}"'},
+    )
+
+
+@app.get("/admin/api/search")
+def admin_search(request: Request):
+    guard = require_admin(request)
+    if guard:
+        return guard
+    q = request.query_params
+    scope = (q.get("scope") or "all").strip().lower()
+    if scope not in {"all", "transcript", "evidence"}:
+        scope = "all"
+    try:
+        limit = max(1, min(50, int(q.get("limit") or 20)))
+        page = max(0, int(q.get("page") or 0))
+    except ValueError:
+        return JSONResponse({"detail": "Bad limit or page"}, status_code=400)
+
+    items = search_attempts(q.get("q") or "", scope=scope, limit=limit, page=page)
+    more = len(items) == limit and (page + 1) * limit <= SEARCH_MAX_OFFSET
+    next_page = page + 1 if more else None
+    return JSONResponse({"items": items, "next_page": next_page})
+
+
+@app.get("/admin/api/stats/trainees")
+def admin_trainee_stats(request: Request):
+    guard = require_admin(request)
+    if guard:
+        return guard
+    q = request.query_params
+    items = trainee_stats(
+        user_email=q.get("user_email"),
+        mode=(q.get("mode") or "").strip().lower() or None,
+        level=(q.get("level") or "").strip().lower() or None,
+    )
+    return JSONResponse({"items": items})
+
+
+@app.get("/admin/api/stats/daily")
+def admin_daily_stats(request: Request):
+    guard = require_admin(request)
+    if guard:
+        return guard
+    q = request.query_params
+    items = daily_stats(
+        day_from=(q.get("from") or "").strip() or None,
+        day_to=(q.get("to") or "").strip() or None,
+        mode=(q.get("mode") or "").strip().lower() or None,
+        level=(q.get("level") or "").strip().lower() or None,
+    )
+    return JSONResponse({"items": items})
+
+
+@app.get("/admin/api/evaluation-runs")
+def admin_evaluation_runs(request: Request):
+    """Batch re-grading runs (started with manage.py regrade) and their progress."""
+    guard = require_admin(request)
+    if guard:
+        return guard
+    return JSONResponse({"items": list_evaluation_runs()})
 
 
 @app.get("/admin/api/attempt/{attempt_id}")
@@ -457,7 +975,36 @@ def admin_attempt(request: Request, attempt_id: int):
     guard = require_admin(request)
     if guard:
         return guard
-    a = get_attempt(attempt_id)
-    if not a:
-        return JSONResponse({"detail": "Not found"}, status_code=404)
-    return JSONResponse(a)
+    fields = [f.strip() for f in (request.query_params.get("fields") or "").split(",") if f.strip()]
+    if fields:
+        try:
+            a = get_attempt(attempt_id, fields=fields)
+        except ValueError as e:
+            return JSONResponse({"detail": str(e)}, status_code=400)
+        if not a:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        return JSONResponse(a)
+
+    hit = _report_cache.get(("admin", attempt_id))
+    if hit is None:
+        a = get_attempt(attempt_id)
+        if not a:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        hit = _cached_body(("admin", attempt_id), lambda: json.dumps(a, ensure_ascii=False), _is_final(a))
+    body, etag = hit
+    return _etag_response(request, body, etag, "application/json")
+
+
+@app.get("/admin/api/metrics")
+def admin_metrics(request: Request):
+    guard = require_admin(request)
+    if guard:
+        return guard
+    return JSONResponse({
+        "realtime_sdp": sdp_metrics(),
+        "storage_writes": write_metrics(),
+        "report_cache": {"attempts": _attempt_cache.stats(), "bodies": _report_cache.stats()},
+        "coach": {**coach_metrics(), "ws": coach_ws_metrics()},
+        "evaluations": running_metrics(),
+        "models": governor_metrics(),
+    })
@@ -0,0 +1,457 @@
+# bench.py
+"""
+Benchmarks for CallCoach hot paths, storage and endpoints.
+
+    python bench.py                                   # everything, default sizes
+    python bench.py script_state coach_paths reports
+    python bench.py storage --rows 10000,100000
+    python bench.py --quick --json bench-new.json --compare bench-old.json
+
+Results are printed and, with --json, written as {"meta": ..., "results": {bench: [rows]}}; each
+row is {"name", "unit", "value"} (lower is better), so runs on two commits can be compared
+with --compare. Synthetic data is seeded; storage databases are built once per row count in
+--data-dir and reused (write cases run on a throwaway copy, so the seeded file never grows).
+Model calls are never made: e2e uses a stubbed client (fake_openai), and the /coach rows are
+measured with both tip sources (local script tips and COACH_TIP_SOURCE=llm).
+"""
+import os
+
+# Before settings/governor are imported: a bench run must not pre-warm against the real API
+# or be throttled by the model governor.
+for _k, _v in (("SDP_PREWARM_CONNECTIONS", "0"), ("SDP_KEEPALIVE_S", "0"),
+               ("MODEL_RPM_DEFAULT", "1000000000"), ("MODEL_BURST", "1000000000")):
+    os.environ.setdefault(_k, _v)
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from evaluation import _agent_only, _extract_recent_context, _next_missing_step, _script_state
+
+AGENT_LINES = [
+    "AGENT: Hi, my name is Dana from the support team, how can I help you today?",
+    "AGENT: I'm sorry to hear that, that sounds frustrating.",
+    "AGENT: Could you share your email address please?",
+    "AGENT: Just to confirm, you were charged fifty dollars on January second?",
+    "AGENT: I'll check the billing system and email you within two hours.",
+    "AGENT: To summarize, I opened a ticket for the refund.",
+    "AGENT: Is there anything else I can help with? Please rate the call in the survey.",
+    "AGENT: Okay, let me look at that for you.",
+    "AGENT: Sure, one moment.",
+]
+CUSTOMER_LINES = [
+    "CUSTOMER: I'm really frustrated, I was charged twice.",
+    "CUSTOMER: My email is dana.cohen@mail.com.",
+    "CUSTOMER: Yes, that's right.",
+    "CUSTOMER: When will this be fixed?",
+]
+TURN_COUNTS = (10, 100, 500, 2000)
+
+
+def synthetic_transcript(turns: int, seed: int = 7, filler_only: bool = False) -> str:
+    """Alternating AGENT/CUSTOMER turns; filler_only keeps checkpoints missing (worst case)."""
+    rnd = random.Random(seed)
+    agent = AGENT_LINES[-2:] if filler_only else AGENT_LINES
+    lines = []
+    for i in range(turns):
+        lines.append(rnd.choice(agent) if i % 2 == 0 else rnd.choice(CUSTOMER_LINES))
+    return "\n".join(lines)
+
+
+def _legacy_script_state(transcript: str) -> dict:
+    """The per-checkpoint re.search implementation that script_rules replaced (baseline)."""
+    a = _agent_only(transcript).lower()
+    opening_done = bool(
+        re.search(r"\b(my name is|this is)\b", a)
+        and re.search(r"\b(team|support|from|company)\b", a)
+        and re.search(r"\bhow can i help\b", a)
+    )
+    return {
+        "opening_done": opening_done,
+        "identification_done": bool(re.search(r"\b(name|last\s*(4|four)|id|phone|phone number|email)\b", a)),
+        "empathy_done": bool(re.search(r"\b(i understand|i'm sorry|sorry to hear|that sounds|i can imagine|i appreciate)\b", a)),
+        "clarify_done": bool(re.search(r"\b(can you|could you|may i|what|when|where|which|how)\b", a) or "?" in a),
+        "restate_done": bool(re.search(r"\b(just to confirm|to confirm|to make sure i understand|if i understand|so you('re| are))\b", a)),
+        "expectations_done": bool(re.search(r"\b(next step|what i('ll| will) do|i('ll| will) (check|look|review|open|create|email|call)|within|today|tomorrow|minutes|hours|by (the end|eod))\b", a)),
+        "close_done": bool(re.search(r"\b(to summarize|just to summarize|summary|recap)\b", a)),
+        "feedback_done": bool(re.search(r"\b(survey|feedback|rate|rating)\b", a)),
+        "near_closing": bool(re.search(r"\b(anything else|have a (good|nice) day|goodbye|bye|thank you for calling)\b", a)),
+    }
+
+
+def timeit(fn, *args, repeat: int = 5, min_time: float = 0.2) -> float:
+    """Best-of-repeat mean seconds per call."""
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn(*args)
+        dt = time.perf_counter() - t0
+        if dt >= min_time / repeat:
+            break
+        n *= 2
+    best = dt / n
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn(*args)
+        best = min(best, (time.perf_counter() - t0) / n)
+    return best
+
+
+def row(name: str, seconds: float, unit: str = "us") -> Dict[str, Any]:
+    scale = {"us": 1e6, "ms": 1e3}[unit]
+    return {"name": name, "unit": unit, "value": round(seconds * scale, 3)}
+
+
+def latency_rows(name: str, samples: List[float]) -> List[Dict[str, Any]]:
+    """mean / p50 / p95 (ms) of per-request wall times in seconds."""
+    s = sorted(samples)
+    p95 = s[min(len(s) - 1, int(round(0.95 * (len(s) - 1))))]
+    return [
+        row(f"{name} mean", statistics.fmean(s), "ms"),
+        row(f"{name} p50", statistics.median(s), "ms"),
+        row(f"{name} p95", p95, "ms"),
+    ]
+
+
+# -------------------------
+# Coach hot paths (pure functions, no I/O)
+# -------------------------
+def bench_script_state(opts) -> List[Dict[str, Any]]:
+    out = []
+    for turns in TURN_COUNTS:
+        for case, filler in (("typical", False), ("missing", True)):
+            t = synthetic_transcript(turns, filler_only=filler)
+            assert _legacy_script_state(t) == _script_state(t)
+            out.append(row(f"{turns} turns {case} legacy", timeit(_legacy_script_state, t)))
+            out.append(row(f"{turns} turns {case} rules", timeit(_script_state, t)))
+    return out
+
+
+def bench_coach_paths(opts) -> List[Dict[str, Any]]:
+    out = []
+    for turns in TURN_COUNTS:
+        for case, filler in (("typical", False), ("missing", True)):
+            t = synthetic_transcript(turns, filler_only=filler)
+            state = _script_state(t)
+            out.append(row(f"_next_missing_step {turns} turns {case}", timeit(_next_missing_step, state, t)))
+            out.append(row(f"_extract_recent_context {turns} turns {case}", timeit(_extract_recent_context, t)))
+    return out
+
+
+# -------------------------
+# Report pages
+# -------------------------
+def _report_attempt(mode: str, status: str = "done", seed: int = 7) -> Dict[str, Any]:
+    from fake_openai import _checklist_output, _grade_output
+    from jobs import result_fields
+
+    rnd = random.Random(seed)
+    a = {"id": 1, "created_at": "2026-01-01T00:00:00Z", "user_email": "trainee@example.com",
+         "mode": mode, "level": "medium", "status": status, "call_id": None}
+    if status == "done":
+        a.update(result_fields(_grade_output(rnd) if mode == "exam" else None, _checklist_output(rnd)))
+    return a
+
+
+def bench_reports(opts) -> List[Dict[str, Any]]:
+    from pages import build_exam_report_html, build_training_report_html
+
+    out = []
+    for status in ("done", "pending"):
+        out.append(row(f"build_training_report_html {status}",
+                       timeit(build_training_report_html, _report_attempt("training", status))))
+        out.append(row(f"build_exam_report_html {status}",
+                       timeit(build_exam_report_html, _report_attempt("exam", status))))
+    return out
+
+
+# -------------------------
+# Storage (attempts table at increasing sizes)
+# -------------------------
+def _use_db(path: Path):
+    """Points storage at another database file (fresh pool, migrations re-checked)."""
+    import storage
+
+    storage.stop_writer()
+    while not storage._pool.empty():
+        storage._pool.get_nowait().close()
+    storage.DB_PATH = path
+    storage._ready = False
+
+
+def _populate(path: Path, rows: int, seed: int = 11):
+    """Seeded attempts spread over a year, ~500 trainees; reused if the file already has enough rows."""
+    import storage
+    from fake_openai import _checklist_output, _grade_output
+    from jobs import result_fields
+
+    _use_db(path)
+    with storage._conn() as con:
+        have = con.execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
+    if have >= rows:
+        return
+    rnd = random.Random(seed)
+    transcripts = [synthetic_transcript(rnd.randint(8, 40), seed=i) for i in range(32)]
+    start = datetime(2025, 1, 1)
+    step = timedelta(days=365) / rows
+    t0 = time.perf_counter()
+    chunk = 5000
+    for lo in range(have, rows, chunk):
+        with storage._conn() as con:
+            for i in range(lo, min(rows, lo + chunk)):
+                mode = "exam" if rnd.random() < 0.3 else "training"
+                a = {
+                    "created_at": (start + step * i).isoformat(timespec="seconds") + "Z",
+                    "user_email": f"trainee{rnd.randrange(500)}@example.com",
+                    "mode": mode,
+                    "level": rnd.choice(("easy", "medium", "hard")),
+                    "transcript": rnd.choice(transcripts),
+                    **result_fields(_grade_output(rnd) if mode == "exam" else None, _checklist_output(rnd)),
+                }
+                storage._insert_attempt(con, a, storage._attempt_row(a))
+        print(f"   populating {path.name}: {min(rows, lo + chunk)}/{rows} "
+              f"({time.perf_counter() - t0:.0f}s)", file=sys.stderr)
+
+
+def bench_storage(opts) -> List[Dict[str, Any]]:
+    import storage
+
+    data_dir = Path(opts.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    out = []
+    for rows in opts.rows:
+        seeded = data_dir / f"attempts-{rows}.db"
+        _populate(seeded, rows)
+        with storage._conn() as con:
+            max_id = con.execute("SELECT MAX(id) FROM attempts").fetchone()[0]
+        rnd = random.Random(rows)
+        ids = itertools.cycle([rnd.randint(1, max_id) for _ in range(512)])
+        recent = (datetime(2025, 1, 1) + timedelta(days=358)).isoformat()
+        cases: List[tuple] = [
+            ("get_attempt report fields", lambda: storage.get_attempt(next(ids), fields=storage.REPORT_FIELDS)),
+            ("get_attempt full row", lambda: storage.get_attempt(next(ids))),
+            ("list_attempts first page", lambda: storage.list_attempts(limit=50)),
+            ("list_attempts mid cursor", lambda: storage.list_attempts(limit=50, cursor=max_id // 2)),
+            ("list_attempts by trainee", lambda: storage.list_attempts(limit=50, user_email="trainee7@example.com")),
+            ("list_attempts last 7 days exam", lambda: storage.list_attempts(limit=50, mode="exam", created_from=recent)),
+            ("trainee_stats", lambda: storage.trainee_stats()),
+            ("daily_stats", lambda: storage.daily_stats()),
+            ("search_attempts phrase", lambda: storage.search_attempts("charged twice")),
+        ]
+        for name, fn in cases:
+            out.append(row(f"{rows} rows {name}", timeit(fn, repeat=3, min_time=0.1), "ms"))
+
+        # Writes go to a copy so every run measures the same table
+        with storage._conn() as con:
+            con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        _use_db(seeded)
+        scratch = data_dir / f"attempts-{rows}-scratch.db"
+        shutil.copyfile(seeded, scratch)
+        _use_db(scratch)
+        try:
+            a = {"user_email": "bench@example.com", "mode": "training", "level": "easy",
+                 "transcript": synthetic_transcript(20), "checklist_score": 80, "checklist_json": "{}"}
+            out.append(row(f"{rows} rows save_attempt single", timeit(storage.save_attempt, a, repeat=3, min_time=0.1), "ms"))
+
+            async def burst(n: int = 64):
+                await asyncio.gather(*(storage.asave_attempt(a) for _ in range(n)))
+
+            t0 = time.perf_counter()
+            asyncio.run(burst())
+            out.append(row(f"{rows} rows save_attempt 64 concurrent (per save)", (time.perf_counter() - t0) / 64, "ms"))
+        finally:
+            _use_db(seeded)
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{scratch}{suffix}").unlink(missing_ok=True)
+    storage.stop_writer()
+    return out
+
+
+# -------------------------
+# End-to-end endpoints (TestClient, stubbed model client)
+# -------------------------
+class _StubResponses:
+    """responses.create stand-in: canned fake_openai outputs after a fixed latency."""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+
+    async def create(self, **kwargs):
+        from fake_openai import _KINDS, _messages, _output
+
+        msgs = _messages(kwargs)
+        kind = _KINDS.get(msgs["system"].strip(), "other")
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        return SimpleNamespace(output_text=json.dumps(_output(kind, msgs["user"])))
+
+
+def bench_e2e(opts) -> List[Dict[str, Any]]:
+    db = Path(opts.data_dir) / "e2e.db"
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db}{suffix}").unlink(missing_ok=True)
+    _use_db(db)
+
+    import app as app_module
+    import evaluation
+    import storage
+    from fastapi.testclient import TestClient
+
+    # No key or SDK needed: the app only checks they are present, and every call goes to the stub
+    evaluation.client = SimpleNamespace(responses=_StubResponses(opts.model_latency_ms))
+    app_module.HAS_KEY = True
+    if app_module.OpenAI is None:
+        app_module.OpenAI = object
+
+    n = opts.e2e_requests
+    transcript = synthetic_transcript(20)
+    out = []
+    with TestClient(app_module.app) as c:
+        c.post("/login", json={"email": "bench@example.com", "password": "bench"}).raise_for_status()
+
+        def timed(path: str, payload: Dict[str, Any]) -> tuple:
+            t0 = time.perf_counter()
+            r = c.post(path, json=payload)
+            dt = time.perf_counter() - t0
+            if r.status_code != 200:
+                raise RuntimeError(f"{path} -> {r.status_code}: {r.text[:200]}")
+            return dt, r.json()
+
+        def finished(attempt_id: int, t0: float) -> float:
+            while (storage.get_attempt(attempt_id, fields=("status",)) or {}).get("status") == "pending":
+                time.sleep(0.002)
+            return time.perf_counter() - t0
+
+        # "llm" sends every tip through the stubbed model; the tip cache is off for those rows
+        # so repeated transcripts do not turn into cache hits.
+        tip_source, tip_cache = evaluation.COACH_TIP_SOURCE, evaluation._tip_cache
+        try:
+            for source in ("local", "llm"):
+                evaluation.COACH_TIP_SOURCE = source
+                evaluation._tip_cache = tip_cache if source == "local" else None
+                samples = [timed("/coach", {"transcript": transcript})[0] for _ in range(n)]
+                out += latency_rows(f"POST /coach full transcript ({source})", samples)
+
+                samples = []
+                for call in range(max(1, n // 20)):
+                    call_id = storage.create_call("bench@example.com", "easy")  # /coach only serves owned calls
+                    lines = synthetic_transcript(20, seed=call).splitlines()
+                    for seq, ln in enumerate(lines):
+                        role, _, text = ln.partition(": ")
+                        turn = {"seq": seq, "role": role, "text": text}
+                        samples.append(timed("/coach", {"call_id": call_id, "turns": [turn]})[0])
+                out += latency_rows(f"POST /coach delta turn ({source})", samples)
+        finally:
+            evaluation.COACH_TIP_SOURCE, evaluation._tip_cache = tip_source, tip_cache
+
+        for path, name in (("/aftercall", "POST /aftercall"), ("/grade", "POST /grade")):
+            req, done = [], []
+            for _ in range(n):
+                t0 = time.perf_counter()
+                dt, body = timed(path, {"level": "easy", "transcript": transcript})
+                req.append(dt)
+                done.append(finished(int(body["attempt_id"]), t0))
+            out += latency_rows(name, req)
+            out += latency_rows(f"{name} until evaluated", done)
+    storage.stop_writer()
+    return out
+
+
+BENCHES: Dict[str, Callable] = {
+    "script_state": bench_script_state,
+    "coach_paths": bench_coach_paths,
+    "reports": bench_reports,
+    "storage": bench_storage,
+    "e2e": bench_e2e,
+}
+
+
+def _meta(opts) -> Dict[str, Any]:
+    def git(*args) -> str:
+        try:
+            return subprocess.run(["git", *args], cwd=Path(__file__).resolve().parent,
+                                  capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rows": opts.rows,
+        "e2e_requests": opts.e2e_requests,
+        "model_latency_ms": opts.model_latency_ms,
+    }
+
+
+def compare(results: Dict[str, List[Dict[str, Any]]], baseline_path: str, threshold: float = 0.10):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        base = json.load(f).get("results", {})
+    print(f"== compare with {baseline_path}")
+    for bench, rows in results.items():
+        old = {r["name"]: r for r in base.get(bench, [])}
+        for r in rows:
+            o = old.get(r["name"])
+            if not o or o["unit"] != r["unit"] or not o["value"]:
+                continue
+            ratio = r["value"] / o["value"]
+            flag = "  SLOWER" if ratio > 1 + threshold else ("  faster" if ratio < 1 - threshold else "")
+            print(f"{bench:>12}  {r['name']:<52} {o['value']:>11.3f} -> {r['value']:>11.3f} {r['unit']:<2} {ratio:>6.2f}x{flag}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="CallCoach benchmarks")
+    ap.add_argument("bench", nargs="*", metavar="BENCH", help=f"one of {', '.join(BENCHES)} (default: all)")
+    ap.add_argument("--json", metavar="PATH", help="write results as JSON")
+    ap.add_argument("--compare", metavar="PATH", help="print ratios against an earlier --json file")
+    ap.add_argument("--quick", action="store_true", help="10k storage rows and fewer e2e requests")
+    ap.add_argument("--rows", help="comma-separated attempt row counts (default: 10000,100000,1000000)")
+    ap.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "callcoach-bench"),
+                    help="where generated databases are kept between runs")
+    ap.add_argument("--e2e-requests", type=int, help="requests per endpoint (default: 200, --quick: 40)")
+    ap.add_argument("--model-latency-ms", type=float, default=0.0, help="stubbed model call latency")
+    args = ap.parse_args(argv)
+    unknown = [b for b in args.bench if b not in BENCHES]
+    if unknown:
+        ap.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    try:
+        args.rows = [int(x) for x in (args.rows or ("10000" if args.quick else "10000,100000,1000000")).split(",")]
+    except ValueError:
+        ap.error("--rows takes comma-separated integers")
+    if args.e2e_requests is None:
+        args.e2e_requests = 40 if args.quick else 200
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for name in args.bench or BENCHES:
+        print(f"== {name}")
+        results[name] = BENCHES[name](args)
+        for r in results[name]:
+            print(f"   {r['name']:<56} {r['value']:>12.3f} {r['unit']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": _meta(args), "results": results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
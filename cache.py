@@ -0,0 +1,71 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU map with an optional TTL (0 = entries never expire)."""
+
+    def __init__(self, max_items: int, ttl_s: float = 0.0):
+        self.max_items = max(1, int(max_items))
+        self.ttl_s = float(ttl_s)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (self.ttl_s and time.monotonic() - entry[1] > self.ttl_s):
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_with_age(self, key: Hashable, default: Any = None) -> Tuple[Any, Optional[float]]:
+        """Like get(), also returning the entry's age in seconds (None on a miss)."""
+        with self._lock:
+            entry = self._data.get(key)
+            age = time.monotonic() - entry[1] if entry is not None else None
+            if age is None or (self.ttl_s and age > self.ttl_s):
+                self.misses += 1
+                return default, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0], age
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
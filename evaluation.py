@@ -1,10 +1,36 @@
 # evaluation.py
+import asyncio
+import hashlib
 import json
 import re
-from typing import Dict, Any, List, Optional
-
-from settings import client, COACH_MODEL, GRADER_MODEL
-from prompts import COACH_SYSTEM_PROMPT, GRADER_RUBRIC, CHECKLIST_SYSTEM_PROMPT
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from cache import LRUCache
+from governor import admit, COACH, GRADE
+from script_rules import ScriptMatcher, DEFAULT_MATCHER, matcher_for, tone_trigger
+from settings import (
+    client,
+    COACH_MODEL,
+    COACH_TIP_SOURCE,
+    COACH_TONE_CHECK,
+    COACH_DEADLINE_MS,
+    COACH_TIP_CACHE_SIZE,
+    COACH_TIP_CACHE_TTL_S,
+    COACH_TIP_CACHE_FRESH_S,
+    GRADER_MODEL,
+    GRADE_SINGLE_PASS,
+    COACH_SESSION_MAX,
+    COACH_SESSION_TTL_S,
+)
+from prompts import COACH_SYSTEM_PROMPT, COACH_PHRASES, COACH_URGENCY, GRADER_RUBRIC, CHECKLIST_SYSTEM_PROMPT, EXAM_SINGLE_PASS_PROMPT
+
+
+async def _model_call(priority: int, **kwargs):
+    """client.responses.create behind the per-model governor (may raise governor.Saturated)."""
+    async with admit(kwargs["model"], priority):
+        return await client.responses.create(**kwargs)
 
 
 def _extract_recent_context(transcript: str, max_lines: int = 14) -> str:
@@ -19,80 +45,63 @@ def _agent_only(transcript: str) -> str:
     return "\n".join(agent_lines)
 
 
+def _last_agent_turn(focus: str) -> str:
+    for ln in reversed(focus.splitlines()):
+        if ln.upper().startswith("AGENT:"):
+            return ln[6:]
+    return ""
+
+
 def _has_customer(transcript: str) -> bool:
     t = (transcript or "").upper()
     return "CUSTOMER:" in t
 
 
-def _script_state(transcript: str) -> dict:
-    a = _agent_only(transcript).lower()
-
-    opening_done = bool(
-        re.search(r"\b(my name is|this is)\b", a)
-        and re.search(r"\b(team|support|from|company)\b", a)
-        and re.search(r"\bhow can i help\b", a)
-    )
-
-    # Identification / verification (asked for name/id/last4/phone/email)
-    identification_done = bool(
-        re.search(r"\b(name|last\s*(4|four)|id|phone|phone number|email)\b", a)
-    )
-
-    empathy_done = bool(
-        re.search(r"\b(i understand|i'm sorry|sorry to hear|that sounds|i can imagine|i appreciate)\b", a)
-    )
-
-    clarify_done = bool(
-        re.search(r"\b(can you|could you|may i|what|when|where|which|how)\b", a)
-        or "?" in a
-    )
-
-    restate_done = bool(
-        re.search(r"\b(just to confirm|to confirm|to make sure i understand|if i understand|so you('re| are))\b", a)
-    )
+# Checkpoints are defined in script_rules; opening needs all three of its parts
+_OPENING_PARTS = {"opening_name", "opening_team", "opening_help"}
 
-    expectations_done = bool(
-        re.search(r"\b(next step|what i('ll| will) do|i('ll| will) (check|look|review|open|create|email|call)|within|today|tomorrow|minutes|hours|by (the end|eod))\b", a)
-    )
 
-    close_done = bool(re.search(r"\b(to summarize|just to summarize|summary|recap)\b", a))
+def _state_from_checks(found: set) -> dict:
+    return {
+        "opening_done": _OPENING_PARTS <= found,
+        "identification_done": "identification" in found,
+        "empathy_done": "empathy" in found,
+        "clarify_done": "clarify" in found,
+        "restate_done": "restate" in found,
+        "expectations_done": "expectations" in found,
+        "close_done": "close" in found,
+        "feedback_done": "feedback" in found,
+        "near_closing": "near_closing" in found,
+    }
 
-    feedback_done = bool(re.search(r"\b(survey|feedback|rate|rating)\b", a))
 
-    near_closing = bool(re.search(r"\b(anything else|have a (good|nice) day|goodbye|bye|thank you for calling)\b", a))
+def _script_state(transcript: str, matcher: ScriptMatcher = DEFAULT_MATCHER) -> dict:
+    a = _agent_only(transcript).lower()
+    return _state_from_checks(matcher.scan(a))
 
-    return {
-        "opening_done": opening_done,
-        "identification_done": identification_done,
-        "empathy_done": empathy_done,
-        "clarify_done": clarify_done,
-        "restate_done": restate_done,
-        "expectations_done": expectations_done,
-        "close_done": close_done,
-        "feedback_done": feedback_done,
-        "near_closing": near_closing,
-    }
 
+def _next_missing_step(state: dict, transcript: str = "", has_customer: Optional[bool] = None) -> Optional[str]:
+    if has_customer is None:
+        has_customer = _has_customer(transcript)
 
-def _next_missing_step(state: dict, transcript: str) -> Optional[str]:
     # Prefer one next action (lowest cognitive load)
     if not state["opening_done"]:
         return "opening"
 
     # Early script: identification (optional but recommended)
-    if _has_customer(transcript) and not state["identification_done"]:
+    if has_customer and not state["identification_done"]:
         return "verification"
 
-    if _has_customer(transcript) and not state["empathy_done"]:
+    if has_customer and not state["empathy_done"]:
         return "empathy"
 
-    if _has_customer(transcript) and not state["clarify_done"]:
+    if has_customer and not state["clarify_done"]:
         return "clarify"
 
-    if _has_customer(transcript) and not state["restate_done"]:
+    if has_customer and not state["restate_done"]:
         return "restate"
 
-    if _has_customer(transcript) and not state["expectations_done"]:
+    if has_customer and not state["expectations_done"]:
         return "plan"
 
     if state["near_closing"]:
@@ -104,18 +113,331 @@ def _next_missing_step(state: dict, transcript: str) -> Optional[str]:
     return None
 
 
-def coach_tips(transcript: str) -> Dict[str, Any]:
+# -------------------------
+# Per-call coach session (incremental script tracking)
+# -------------------------
+_NO_TIP = {"should_intervene": False, "tip": "", "reason_tag": "other", "urgency": "low"}
+
+_coach_stats = {
+    "polls": 0,
+    "local_tips": 0,
+    "tone_triggers": 0,  # latest agent turn tripped script_rules.tone_trigger => model consulted
+    "model_calls": 0,
+    "skipped_delivered": 0,  # next step's tag already shown => no tip, no model call
+    "suppressed_repeats": 0,
+    # model-written tips vs COACH_DEADLINE_MS: shown in time / finished after it / never used
+    "tips_on_time": 0,
+    "tips_late": 0,
+    "tips_dropped": 0,
+    # actual model round trips only (tip-cache hits are not timed)
+    "model_ms_n": 0,
+    "model_ms_sum": 0.0,
+    "model_ms_max": 0.0,
+}
+
+
+class CoachSession:
+    """
+    Script state for one live call. The page sends either only the turns added since the
+    last ack (apply_turns) or a growing transcript (update); either way only new lines are
+    scanned, and only for checkpoints still missing, so per-poll work does not grow with
+    call length.
+    """
+
+    RECENT_LINES = 14
+    _BOUNDARY_CHARS = 64
+
+    def __init__(self, matcher: ScriptMatcher = DEFAULT_MATCHER):
+        self.matcher = matcher
+        # What the page was already shown; kept across a transcript rewrite (_reset)
+        self.delivered_tags: set = set()
+        self.delivered_tips: set = set()
+        self.inflight: Optional[asyncio.Task] = None  # model call for the latest poll
+        self._reset()
+
+    def sync_delivered(self, tags: List[Any]):
+        """The page reports the tags it actually showed (an aborted request's tip never was)."""
+        self.delivered_tags = {str(t) for t in tags[:64] if t}
+
+    def _reset(self):
+        self.found: set = set()
+        self.has_customer = False
+        self.recent: deque = deque(maxlen=self.RECENT_LINES)
+        self._consumed = 0      # transcript chars already scanned
+        self.seq = -1           # last turn applied via apply_turns (delta mode)
+        self._boundary = ""     # tail of the scanned text, to detect a rewritten transcript
+
+    def update(self, transcript: str):
+        t = transcript or ""
+        lo = max(0, self._consumed - self._BOUNDARY_CHARS)
+        if len(t) < self._consumed or t[lo:self._consumed] != self._boundary:
+            self._reset()
+        for line in t[self._consumed:].splitlines():
+            self.add_line(line)
+        self._consumed = len(t)
+        self._boundary = t[max(0, len(t) - self._BOUNDARY_CHARS):]
+
+    def apply_turns(self, turns: List[Dict[str, Any]]) -> bool:
+        """
+        Delta mode: applies turns in seq order, ignoring ones already seen. Returns False on
+        a gap (e.g. the session was evicted), so the caller can ask for a resend from self.seq.
+        """
+        for t in sorted(turns, key=lambda x: x["seq"]):
+            if t["seq"] <= self.seq:
+                continue
+            if t["seq"] != self.seq + 1:
+                return False
+            self.add_line(f"{t['role']}: {t['text']}")
+            self.seq = t["seq"]
+        return True
+
+    def add_line(self, line: str):
+        ln = (line or "").strip()
+        if not ln:
+            return
+        self.recent.append(ln)
+        up = ln.upper()
+        if "CUSTOMER:" in up:
+            self.has_customer = True
+        if up.startswith("AGENT:") and not self.matcher.complete(self.found):
+            self.matcher.scan(ln.lower(), self.found)
+
+    def state(self) -> dict:
+        return _state_from_checks(self.found)
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """Changes whenever new transcript arrives (either feeding mode)."""
+        return self.seq, self._consumed
+
+    def next_step(self) -> Optional[str]:
+        return _next_missing_step(self.state(), has_customer=self.has_customer)
+
+    def recent_context(self) -> str:
+        return "\n".join(self.recent)[-2400:]
+
+    def deliver(self, out: Dict[str, Any], step: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Same anti-repeat rule as the page: each tag and each tip is shown once per call.
+        step (the missing step being coached) is recorded too, as the model may tag it differently.
+        """
+        tip, tag = out.get("tip") or "", out.get("reason_tag") or "other"
+        if not out.get("should_intervene") or not tip:
+            return out
+        if tag in self.delivered_tags or tip in self.delivered_tips:
+            _coach_stats["suppressed_repeats"] += 1
+            return dict(_NO_TIP)
+        self.delivered_tags.add(tag)
+        if step:
+            self.delivered_tags.add(step)
+        self.delivered_tips.add(tip)
+        return out
+
+
+_coach_sessions = LRUCache(COACH_SESSION_MAX, ttl_s=COACH_SESSION_TTL_S)
+
+
+def coach_session(key, scenario_id: str = "") -> CoachSession:
+    """Get-or-create the session for a call; every access refreshes its idle TTL."""
+    session = _coach_sessions.get(key)
+    if session is None:
+        session = CoachSession(matcher_for(scenario_id))
+    _coach_sessions.set(key, session)
+    return session
+
+
+_TONE_TAGS = {"tone", "control"}
+
+# Next phrase index per step; rotates across calls so trainees see varied wording
+_phrase_turn: Dict[str, int] = {}
+
+
+def local_tip(missing: str) -> Dict[str, Any]:
+    """Checklist tip from prompts.COACH_PHRASES; no model call."""
+    bank = COACH_PHRASES.get(missing) or []
+    if not bank:
+        return dict(_NO_TIP)
+    i = _phrase_turn.get(missing, 0)
+    _phrase_turn[missing] = i + 1
+    return {
+        "should_intervene": True,
+        "tip": bank[i % len(bank)],
+        "reason_tag": missing,
+        "urgency": COACH_URGENCY.get(missing, "low"),
+    }
+
+
+async def coach_tips(transcript: Optional[str], session: Optional[CoachSession] = None) -> Dict[str, Any]:
+    """transcript=None: the session was already fed through apply_turns."""
+    _coach_stats["polls"] += 1
+    if session is not None:
+        if transcript is not None:
+            session.update(transcript)
+        state = session.state()
+        missing = _next_missing_step(state, has_customer=session.has_customer)
+        delivered = session.delivered_tags
+    else:
+        state = _script_state(transcript)
+        missing = _next_missing_step(state, transcript)
+        delivered = set()
+
+    # The page would discard a tag it already showed, so don't produce one at all
+    if missing in delivered or (not missing and delivered >= _TONE_TAGS):
+        _coach_stats["skipped_delivered"] += 1
+        return dict(_NO_TIP)
+
+    # The missing step fully determines a checklist tip; the model is only needed for
+    # wording (COACH_TIP_SOURCE=llm) or when the latest agent turn trips a tone/control trigger.
+    focus = session.recent_context() if session is not None else _extract_recent_context(transcript)
+    tone = COACH_TONE_CHECK and tone_trigger(_last_agent_turn(focus))
+    if tone:
+        _coach_stats["tone_triggers"] += 1
+    if missing and COACH_TIP_SOURCE != "llm" and not tone:
+        _coach_stats["local_tips"] += 1
+        out = local_tip(missing)
+        return session.deliver(out, missing) if session is not None else out
+    if not missing and not tone:
+        return dict(_NO_TIP)
+
     if client is None:
         return {"should_intervene": False, "tip": "", "reason_tag": "missing_key", "urgency": "low"}
 
-    state = _script_state(transcript)
-    missing = _next_missing_step(state, transcript)
+    out = await _deadline_llm_tip(state, missing, focus, session)
+    if not missing and out["reason_tag"] not in _TONE_TAGS:
+        return dict(_NO_TIP)
+    return session.deliver(out, missing) if session is not None else out
+
+
+def _record_model_ms(t0: float):
+    ms = (time.perf_counter() - t0) * 1000.0
+    _coach_stats["model_ms_n"] += 1
+    _coach_stats["model_ms_sum"] += ms
+    _coach_stats["model_ms_max"] = max(_coach_stats["model_ms_max"], ms)
+
+
+async def _deadline_llm_tip(
+    state: dict, missing: Optional[str], focus: str, session: Optional[CoachSession]
+) -> Dict[str, Any]:
+    """
+    Model tip within COACH_DEADLINE_MS. A newer poll for the same call cancels this one's
+    model call while it is still within its deadline; past it, the call finishes into the tip
+    cache. A result that arrives after newer transcript is ignored.
+    """
+    task = asyncio.ensure_future(_cached_llm_tip(state, missing, focus))
+    version = None
+    if session is not None:
+        if session.inflight is not None and not session.inflight.done():
+            session.inflight.cancel()
+        session.inflight = task
+        version = session.version
+
+    try:
+        out = await asyncio.wait_for(asyncio.shield(task), COACH_DEADLINE_MS / 1000.0)
+    except asyncio.TimeoutError:
+        # Let it finish into the tip cache; it is just no longer worth showing. Detach it from
+        # the session so the next poll does not cancel it (only in-deadline work is superseded).
+        if session is not None and session.inflight is task:
+            session.inflight = None
+        task.add_done_callback(_late_done)
+        return dict(_NO_TIP)
+    except asyncio.CancelledError:
+        _coach_stats["tips_dropped"] += 1
+        if task.cancelled():
+            return dict(_NO_TIP)  # superseded by a newer poll
+        task.cancel()
+        raise
+    except Exception:
+        _coach_stats["tips_dropped"] += 1
+        raise
+    finally:
+        if session is not None and session.inflight is task and task.done():
+            session.inflight = None
+
+    if session is not None and session.version != version:
+        _coach_stats["tips_dropped"] += 1
+        return dict(_NO_TIP)
+    _coach_stats["tips_on_time"] += 1
+    return out
+
+
+def _late_done(task: asyncio.Task):
+    if task.cancelled() or task.exception() is not None:
+        _coach_stats["tips_dropped"] += 1
+        return
+    _coach_stats["tips_late"] += 1
+
+
+# -------------------------
+# Shared cache for model-written tips (stale-while-revalidate)
+# -------------------------
+_tip_cache = LRUCache(COACH_TIP_CACHE_SIZE, ttl_s=COACH_TIP_CACHE_TTL_S) if COACH_TIP_CACHE_SIZE > 0 else None
+_tip_refreshing: Dict[Tuple, asyncio.Task] = {}
+_tip_stats = {"stale_served": 0, "refreshes": 0, "refresh_errors": 0}
+
+_FINGERPRINT_LINES = 4
+_NOT_WORDS = re.compile(r"[^a-z' ]+")
+
 
-    if not missing:
-        return {"should_intervene": False, "tip": "", "reason_tag": "other", "urgency": "low"}
+def _context_fingerprint(focus: str) -> str:
+    """Last few lines, lowercased, digits/punctuation dropped: near-identical tails collide."""
+    tail = (focus or "").splitlines()[-_FINGERPRINT_LINES:]
+    norm = "\n".join(" ".join(_NOT_WORDS.sub(" ", ln.lower()).split()) for ln in tail)
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=12).hexdigest()
 
-    focus = _extract_recent_context(transcript)
 
+def _tip_key(state: dict, missing: Optional[str], focus: str) -> Tuple:
+    return (tuple(bool(state[k]) for k in sorted(state)), missing or "", _context_fingerprint(focus))
+
+
+async def _refresh_tip(key: Tuple, state: dict, missing: Optional[str], focus: str):
+    try:
+        out = await _llm_tip(state, missing, focus)
+        if out["reason_tag"] != "parse_error":
+            _tip_cache.set(key, out)
+        _tip_stats["refreshes"] += 1
+    except Exception:
+        _tip_stats["refresh_errors"] += 1
+    finally:
+        _tip_refreshing.pop(key, None)
+
+
+async def _cached_llm_tip(state: dict, missing: Optional[str], focus: str) -> Dict[str, Any]:
+    if _tip_cache is None:
+        return await _llm_tip(state, missing, focus)
+
+    key = _tip_key(state, missing, focus)
+    hit, age = _tip_cache.get_with_age(key)
+    if hit is not None:
+        if age > COACH_TIP_CACHE_FRESH_S and key not in _tip_refreshing:
+            _tip_stats["stale_served"] += 1
+            _tip_refreshing[key] = asyncio.create_task(_refresh_tip(key, state, missing, focus))
+        return dict(hit)
+
+    out = await _llm_tip(state, missing, focus)
+    if out["reason_tag"] != "parse_error":
+        _tip_cache.set(key, dict(out))
+    return out
+
+
+def coach_metrics() -> Dict[str, Any]:
+    if _tip_cache is None:
+        tip_cache = {"enabled": False}
+    else:
+        tip_cache = {"enabled": True, **_tip_cache.stats(), **_tip_stats, "refreshing": len(_tip_refreshing)}
+    timed = _coach_stats["model_ms_n"]
+    return {
+        **_coach_stats,
+        "model_ms_sum": round(_coach_stats["model_ms_sum"], 1),
+        "model_ms_max": round(_coach_stats["model_ms_max"], 1),
+        "model_ms_avg": round(_coach_stats["model_ms_sum"] / timed, 1) if timed else 0.0,
+        "deadline_ms": COACH_DEADLINE_MS,
+        "live_sessions": len(_coach_sessions),
+        "tip_cache": tip_cache,
+    }
+
+
+async def _llm_tip(state: dict, missing: Optional[str], focus: str) -> Dict[str, Any]:
+    next_step = missing or "none (checklist on track; intervene ONLY for tone or control)"
     user_msg = (
         "Call-script status (True/False):\n"
         f"- opening={state['opening_done']}\n"
@@ -126,11 +448,14 @@ def coach_tips(transcript: str) -> Dict[str, Any]:
         f"- expectations={state['expectations_done']}\n"
         f"- close={state['close_done']}\n"
         f"- feedback={state['feedback_done']}\n"
-        f"Next missing step to coach NOW: {missing}\n\n"
+        f"Next missing step to coach NOW: {next_step}\n\n"
         f"Transcript (recent):\n{focus}"
     )
 
-    r = client.responses.create(
+    _coach_stats["model_calls"] += 1
+    t0 = time.perf_counter()
+    r = await _model_call(
+        COACH,
         model=COACH_MODEL,
         input=[
             {"role": "system", "content": COACH_SYSTEM_PROMPT},
@@ -138,12 +463,13 @@ def coach_tips(transcript: str) -> Dict[str, Any]:
         ],
         max_output_tokens=160,
     )
+    _record_model_ms(t0)
 
     txt = (r.output_text or "").strip()
     try:
         data = json.loads(txt)
     except Exception:
-        return {"should_intervene": False, "tip": "", "reason_tag": "parse_error", "urgency": "low"}
+        return {**_NO_TIP, "reason_tag": "parse_error"}
 
     tip = str(data.get("tip") or "").strip()
     words = tip.split()
@@ -173,7 +499,7 @@ def coach_tips(transcript: str) -> Dict[str, Any]:
     return out
 
 
-def grade_exam(transcript: str) -> Dict[str, Any]:
+async def grade_exam(transcript: str) -> Dict[str, Any]:
     if client is None:
         return {
             "score": 0,
@@ -184,7 +510,8 @@ def grade_exam(transcript: str) -> Dict[str, Any]:
         }
 
     payload = (transcript or "")[-4500:].strip() or "(empty transcript)"
-    r = client.responses.create(
+    r = await _model_call(
+        GRADE,
         model=GRADER_MODEL,
         input=[
             {"role": "system", "content": GRADER_RUBRIC},
@@ -197,6 +524,12 @@ def grade_exam(transcript: str) -> Dict[str, Any]:
     try:
         data = json.loads(txt)
     except Exception:
+        data = None
+    return _clean_grade(data)
+
+
+def _clean_grade(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
         data = {
             "score": 0,
             "pass": False,
@@ -220,7 +553,7 @@ def grade_exam(transcript: str) -> Dict[str, Any]:
     }
 
 
-def evaluate_checklist(transcript: str, customer_type: str = "", emotion_level: Optional[int] = None) -> Dict[str, Any]:
+async def evaluate_checklist(transcript: str, customer_type: str = "", emotion_level: Optional[int] = None) -> Dict[str, Any]:
     """
     After-call evaluation focused on human skills + call script.
     Returns: checklist_score + itemized statuses + short improvements.
@@ -235,14 +568,10 @@ def evaluate_checklist(transcript: str, customer_type: str = "", emotion_level:
         }
 
     payload = (transcript or "")[-6500:].strip() or "(empty transcript)"
-    meta = []
-    if customer_type:
-        meta.append(f"customer_type={customer_type}")
-    if emotion_level is not None:
-        meta.append(f"emotion_level={emotion_level}")
-    meta_txt = ("\nMeta: " + ", ".join(meta)) if meta else ""
+    meta_txt = _meta_text(customer_type, emotion_level)
 
-    r = client.responses.create(
+    r = await _model_call(
+        GRADE,
         model=GRADER_MODEL,
         input=[
             {"role": "system", "content": CHECKLIST_SYSTEM_PROMPT},
@@ -255,6 +584,12 @@ def evaluate_checklist(transcript: str, customer_type: str = "", emotion_level:
     try:
         data = json.loads(txt)
     except Exception:
+        data = None
+    return _clean_checklist(data)
+
+
+def _clean_checklist(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
         return {
             "checklist_score": 0,
             "items": [],
@@ -297,3 +632,49 @@ def evaluate_checklist(transcript: str, customer_type: str = "", emotion_level:
         "improvements": improvements,
         "next_time_say": next_time_say,
     }
+
+
+def _meta_text(customer_type: str = "", emotion_level: Optional[int] = None) -> str:
+    meta = []
+    if customer_type:
+        meta.append(f"customer_type={customer_type}")
+    if emotion_level is not None:
+        meta.append(f"emotion_level={emotion_level}")
+    return ("\nMeta: " + ", ".join(meta)) if meta else ""
+
+
+async def grade_exam_single_pass(transcript: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    One model call that returns both the GRADER_RUBRIC grade and the checklist report.
+    Returns: (grade, checklist) in the same shapes as grade_exam / evaluate_checklist.
+    """
+    if client is None:
+        return await grade_exam(transcript), await evaluate_checklist(transcript)
+
+    payload = (transcript or "")[-6500:].strip() or "(empty transcript)"
+    r = await _model_call(
+        GRADE,
+        model=GRADER_MODEL,
+        input=[
+            {"role": "system", "content": EXAM_SINGLE_PASS_PROMPT},
+            {"role": "user", "content": payload},
+        ],
+        max_output_tokens=800,
+    )
+
+    txt = (r.output_text or "").strip()
+    try:
+        data = json.loads(txt)
+    except Exception:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    return _clean_grade(data.get("grade")), _clean_checklist(data.get("checklist"))
+
+
+async def grade_with_checklist(transcript: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Exam evaluation: grade + checklist, either in one call or as two concurrent calls."""
+    if GRADE_SINGLE_PASS:
+        return await grade_exam_single_pass(transcript)
+    grade, checklist = await asyncio.gather(grade_exam(transcript), evaluate_checklist(transcript))
+    return grade, checklist
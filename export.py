@@ -0,0 +1,65 @@
+# export.py
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+CSV_COLUMNS = [
+    "id", "created_at", "user_email", "mode", "level",
+    "score", "passed", "checklist_score", "summary",
+    "strengths", "improvements", "customer_type", "emotion_level", "call_id", "status",
+]
+
+
+def _json_or(x: Any, default: Any) -> Any:
+    if not isinstance(x, str) or not x.strip():
+        return default
+    try:
+        return json.loads(x)
+    except Exception:
+        return default
+
+
+def export_row(a: Dict[str, Any], include_items: bool = False) -> Dict[str, Any]:
+    out = {k: v for k, v in a.items() if k != "checklist_json"}
+    out["strengths"] = _json_or(a.get("strengths"), [])
+    out["improvements"] = _json_or(a.get("improvements"), [])
+    if include_items:
+        checklist = _json_or(a.get("checklist_json"), {})
+        out["checklist_items"] = checklist.get("items", []) if isinstance(checklist, dict) else []
+    return out
+
+
+def ndjson_lines(rows: Iterable[Dict[str, Any]], include_items: bool = False) -> Iterator[str]:
+    for a in rows:
+        yield json.dumps(export_row(a, include_items), ensure_ascii=False) + "\n"
+
+
+def csv_lines(rows: Iterable[Dict[str, Any]], include_items: bool = False, include_transcript: bool = False) -> Iterator[str]:
+    columns = list(CSV_COLUMNS)
+    if include_items:
+        columns.append("checklist_items")
+    if include_transcript:
+        columns.append("transcript")
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def flush() -> str:
+        line = buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+        return line
+
+    writer.writerow(columns)
+    yield flush()
+    for a in rows:
+        r = export_row(a, include_items)
+        values = []
+        for c in columns:
+            v = r.get(c)
+            if isinstance(v, (list, dict)):
+                v = json.dumps(v, ensure_ascii=False)
+            values.append("" if v is None else v)
+        writer.writerow(values)
+        yield flush()
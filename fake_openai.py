@@ -0,0 +1,395 @@
+# fake_openai.py
+"""
+Offline stand-in for the two OpenAI APIs CallCoach calls, for load and latency testing
+without spending tokens or needing network access:
+
+    POST /v1/responses        responses.create (coach tips, exam grade, checklist, single pass)
+    POST /v1/realtime/calls   WebRTC SDP exchange (openai_realtime.py)
+    GET|HEAD /v1/models       connection pre-warm
+
+Run it, then point the app at it:
+
+    python fake_openai.py --port 8100 --latency lognormal:600,0.4 --error-rate 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=sk-fake uvicorn app:app --port 8040
+
+Latency specs (milliseconds): fixed:MS | uniform:LO,HI | normal:MEAN,SD | lognormal:MEDIAN,SIGMA | exp:MEAN
+The realtime answer SDP is canned: the browser's media connection will not come up, but the
+server-side call setup path is exercised exactly as in production.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from prompts import (
+    CHECKLIST_SYSTEM_PROMPT,
+    COACH_PHRASES,
+    COACH_SYSTEM_PROMPT,
+    EXAM_SINGLE_PASS_PROMPT,
+    GRADER_RUBRIC,
+)
+from settings import env_str, env_float
+
+# -------------------------
+# Configuration (FAKE_* env vars, CLI flags, or POST /_fake/config at runtime)
+# -------------------------
+CONFIG: Dict[str, Any] = {
+    "latency": env_str("FAKE_LATENCY", "lognormal:700,0.35"),             # /v1/responses
+    "realtime_latency": env_str("FAKE_REALTIME_LATENCY", "lognormal:300,0.3"),
+    "ms_per_token": env_float("FAKE_MS_PER_TOKEN", 0.0),                  # added per output token
+    "error_rate": env_float("FAKE_ERROR_RATE", 0.0),                      # -> 500
+    "rate_limit_rate": env_float("FAKE_RATE_LIMIT_RATE", 0.0),            # -> 429 + Retry-After
+    "outputs": env_str("FAKE_OUTPUTS", ""),  # JSON file: {"coach"|"grade"|"checklist"|"exam": output}
+}
+
+_rng = random.Random(env_str("FAKE_SEED", "") or None)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency spec -> sampler returning milliseconds (never negative)."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    try:
+        nums = [float(x) for x in args.split(",") if x.strip()]
+    except ValueError:
+        raise ValueError(f"Bad latency spec: {spec!r}")
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(nums) == 1:
+        return lambda r: max(0.0, nums[0])
+    if kind == "uniform" and len(nums) == 2:
+        return lambda r: max(0.0, r.uniform(nums[0], nums[1]))
+    if kind == "normal" and len(nums) == 2:
+        return lambda r: max(0.0, r.gauss(nums[0], nums[1]))
+    if kind == "lognormal" and len(nums) == 2:
+        mu = math.log(max(nums[0], 1e-3))
+        return lambda r: r.lognormvariate(mu, nums[1])
+    if kind == "exp" and len(nums) == 1:
+        return lambda r: r.expovariate(1.0 / max(nums[0], 1e-3))
+    raise ValueError(f"Bad latency spec: {spec!r}")
+
+
+_samplers: Dict[str, Callable[[random.Random], float]] = {}
+_outputs: Dict[str, Any] = {}
+
+
+def configure(**changes):
+    """Validates and applies config changes (unknown keys are rejected)."""
+    unknown = set(changes) - set(CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown setting(s): {', '.join(sorted(unknown))}")
+    new = {**CONFIG, **changes}
+    samplers = {"latency": parse_latency(new["latency"]), "realtime_latency": parse_latency(new["realtime_latency"])}
+    outputs: Dict[str, Any] = {}
+    if new["outputs"]:
+        with open(new["outputs"], "r", encoding="utf-8") as f:
+            outputs = json.load(f)
+        if not isinstance(outputs, dict):
+            raise ValueError("FAKE_OUTPUTS must hold a JSON object keyed by coach/grade/checklist/exam")
+    CONFIG.update(new)
+    _samplers.update(samplers)
+    _outputs.clear()
+    _outputs.update(outputs)
+
+
+configure()
+
+_stats: Dict[str, Any] = {
+    "requests": {},
+    "errors": 0,
+    "rate_limited": 0,
+    "latency_ms_sum": 0.0,
+    "latency_ms_max": 0.0,
+}
+
+
+def _count(kind: str):
+    _stats["requests"][kind] = _stats["requests"].get(kind, 0) + 1
+
+
+async def _delay(sampler: str, extra_ms: float = 0.0):
+    ms = _samplers[sampler](_rng) + extra_ms
+    _stats["latency_ms_sum"] += ms
+    _stats["latency_ms_max"] = max(_stats["latency_ms_max"], ms)
+    await asyncio.sleep(ms / 1000.0)
+
+
+def _injected_error() -> Optional[JSONResponse]:
+    x = _rng.random()
+    if x < CONFIG["rate_limit_rate"]:
+        _stats["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"Retry-After": "1"},
+        )
+    if x < CONFIG["rate_limit_rate"] + CONFIG["error_rate"]:
+        _stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Injected failure (fake)", "type": "server_error"}}, status_code=500)
+    return None
+
+
+def _unauthorized(request: Request) -> Optional[JSONResponse]:
+    if not (request.headers.get("authorization") or "").startswith("Bearer "):
+        return JSONResponse({"error": {"message": "Missing bearer token", "type": "invalid_request_error"}}, status_code=401)
+    return None
+
+
+# -------------------------
+# Canned model outputs (deterministic per transcript, so repeated runs grade the same)
+# -------------------------
+_KINDS = {
+    COACH_SYSTEM_PROMPT: "coach",
+    GRADER_RUBRIC: "grade",
+    CHECKLIST_SYSTEM_PROMPT: "checklist",
+    EXAM_SINGLE_PASS_PROMPT: "exam",
+}
+_CHECKLIST_ITEMS = [
+    ("opening", "Opening"), ("identification", "Identification"), ("listening", "Listening"),
+    ("empathy", "Empathy"), ("clarify", "Clarify"), ("restate", "Restate"), ("tone", "Professional tone"),
+    ("expectations", "Expectations"), ("close", "Close"), ("feedback", "Feedback"),
+]
+_NEXT_STEP = re.compile(r"Next missing step to coach NOW:\s*(\w+)")
+
+
+def _messages(body: Dict[str, Any]) -> Dict[str, str]:
+    out = {"system": str(body.get("instructions") or ""), "user": ""}
+    items = body.get("input")
+    if isinstance(items, str):
+        out["user"] = items
+        return out
+    for m in items if isinstance(items, list) else []:
+        if isinstance(m, dict) and m.get("role") in ("system", "user"):
+            content = m.get("content")
+            if isinstance(content, list):
+                content = "".join(str(c.get("text") or "") for c in content if isinstance(c, dict))
+            out[m["role"]] = str(content or "")
+    return out
+
+
+def _coach_output(user: str, rnd: random.Random) -> Dict[str, Any]:
+    m = _NEXT_STEP.search(user)
+    step = m.group(1) if m else "none"
+    if step not in COACH_PHRASES:
+        return {"should_intervene": False, "tip": "", "reason_tag": "other", "urgency": "low"}
+    return {"should_intervene": True, "tip": rnd.choice(COACH_PHRASES[step]), "reason_tag": step, "urgency": "medium"}
+
+
+def _grade_output(rnd: random.Random) -> Dict[str, Any]:
+    score = rnd.randint(45, 95)
+    return {
+        "score": score,
+        "pass": score >= 70,
+        "summary": "Fake grade: the agent followed most of the call script.",
+        "strengths": ["Clear opening", "Polite tone"],
+        "improvements": ["Confirm the issue before solving it", "Set a clear timeline"],
+    }
+
+
+def _checklist_output(rnd: random.Random) -> Dict[str, Any]:
+    items = []
+    points = 0.0
+    for _id, title in _CHECKLIST_ITEMS:
+        status = rnd.choices(("done", "partial", "missing"), weights=(6, 2, 2))[0]
+        points += {"done": 1.0, "partial": 0.5, "missing": 0.0}[status]
+        items.append({"id": _id, "title": title, "status": status, "evidence": "", "note": ""})
+    return {
+        "checklist_score": round(100 * points / len(items)),
+        "items": items,
+        "highlights": ["Good opening"],
+        "improvements": ["Restate the problem before solving it"],
+        "next_time_say": ["Just to confirm, you were charged twice this month?"],
+    }
+
+
+def _output(kind: str, user: str) -> Dict[str, Any]:
+    if kind in _outputs:
+        return _outputs[kind]
+    rnd = random.Random(hashlib.blake2b(user.encode("utf-8"), digest_size=8).digest())
+    if kind == "coach":
+        return _coach_output(user, rnd)
+    if kind == "grade":
+        return _grade_output(rnd)
+    if kind == "checklist":
+        return _checklist_output(rnd)
+    if kind == "exam":
+        return {"grade": _grade_output(rnd), "checklist": _checklist_output(rnd)}
+    return {"text": "fake response"}
+
+
+def _response_body(model: str, text: str, input_tokens: int, output_tokens: int) -> Dict[str, Any]:
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": model,
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+# -------------------------
+# App
+# -------------------------
+app = FastAPI(title="Fake OpenAI (CallCoach load testing)")
+
+
+@app.post("/v1/responses")
+async def responses_create(request: Request):
+    denied = _unauthorized(request)
+    if denied:
+        return denied
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({"error": {"message": "Body must be JSON", "type": "invalid_request_error"}}, status_code=400)
+
+    msgs = _messages(body)
+    kind = _KINDS.get(msgs["system"].strip(), "other")
+    _count(kind)
+    text = json.dumps(_output(kind, msgs["user"]), ensure_ascii=False)
+    out_tokens = min(len(text) // 4 + 1, int(body.get("max_output_tokens") or 4096))
+    await _delay("latency", CONFIG["ms_per_token"] * out_tokens)
+    failed = _injected_error()
+    if failed:
+        return failed
+    in_tokens = (len(msgs["system"]) + len(msgs["user"])) // 4 + 1
+    return JSONResponse(_response_body(str(body.get("model") or ""), text, in_tokens, out_tokens))
+
+
+def _answer_sdp(offer: str) -> str:
+    """Canned answer mirroring the offer's media sections (the browser accepts it; ICE will not connect)."""
+    flip = {"a=sendonly": "a=recvonly", "a=recvonly": "a=sendonly", "a=sendrecv": "a=sendrecv", "a=inactive": "a=inactive"}
+    lines = ["v=0", f"o=- {int(time.time())} 2 IN IP4 127.0.0.1", "s=-", "t=0 0"]
+    for ln in offer.splitlines():
+        ln = ln.strip()
+        if ln.startswith(("a=group:", "m=", "c=", "a=mid:", "a=rtpmap:", "a=fmtp:", "a=sctp-port:", "a=rtcp-mux")):
+            lines.append(ln)
+        elif ln in flip:
+            lines.append(flip[ln])
+        elif ln.startswith("a=setup:"):
+            lines.append("a=setup:active")
+    lines += ["a=ice-ufrag:fake", "a=ice-pwd:fakefakefakefakefakefake", "a=fingerprint:sha-256 " + ":".join(["00"] * 32)]
+    return "\r\n".join(lines) + "\r\n"
+
+
+async def _form_fields(request: Request) -> Dict[str, str]:
+    """
+    multipart/form-data text fields, parsed with the stdlib email parser: request.form() would
+    need python-multipart, which nothing else here depends on.
+    """
+    ctype = request.headers.get("content-type") or ""
+    if not ctype.startswith("multipart/form-data"):
+        return {}
+    body = await request.body()
+    msg = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + ctype.encode("latin-1") + b"\r\n\r\n" + body)
+    if not msg.is_multipart():
+        return {}
+    return {
+        part.get_param("name", header="content-disposition"): part.get_payload(decode=True).decode("utf-8", "replace")
+        for part in msg.iter_parts()
+        if part.get_param("name", header="content-disposition")
+    }
+
+
+@app.post("/v1/realtime/calls")
+async def realtime_calls(request: Request):
+    denied = _unauthorized(request)
+    if denied:
+        return denied
+    form = await _form_fields(request)
+    offer = str(form.get("sdp") or "")
+    if not offer.startswith("v=0"):
+        return JSONResponse({"error": {"message": "Invalid SDP offer", "type": "invalid_request_error"}}, status_code=400)
+    try:
+        json.loads(str(form.get("session") or "{}"))
+    except ValueError:
+        return JSONResponse({"error": {"message": "session must be JSON", "type": "invalid_request_error"}}, status_code=400)
+
+    _count("realtime")
+    await _delay("realtime_latency")
+    failed = _injected_error()
+    if failed:
+        return failed
+    call_id = f"rtc_{uuid.uuid4().hex}"
+    return PlainTextResponse(
+        _answer_sdp(offer),
+        status_code=201,
+        media_type="application/sdp",
+        headers={"Location": f"/v1/realtime/calls/{call_id}"},
+    )
+
+
+@app.api_route("/v1/models", methods=["GET", "HEAD"])
+async def models(request: Request):
+    if request.method == "HEAD":
+        return Response(status_code=200)
+    return JSONResponse({"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "fake"}]})
+
+
+@app.get("/_fake/stats")
+def fake_stats():
+    n = sum(_stats["requests"].values())
+    return {
+        **_stats,
+        "latency_ms_avg": round(_stats["latency_ms_sum"] / n, 1) if n else 0.0,
+        "config": CONFIG,
+    }
+
+
+@app.post("/_fake/config")
+async def fake_config(request: Request):
+    try:
+        configure(**(await request.json()))
+    except (TypeError, ValueError, OSError) as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+    return CONFIG
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Fake OpenAI server for CallCoach load testing")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8100)
+    ap.add_argument("--latency", help="responses.create latency spec (default: FAKE_LATENCY)")
+    ap.add_argument("--realtime-latency", help="SDP exchange latency spec (default: FAKE_REALTIME_LATENCY)")
+    ap.add_argument("--ms-per-token", type=float, help="extra ms per output token")
+    ap.add_argument("--error-rate", type=float, help="fraction of calls answered with 500")
+    ap.add_argument("--rate-limit-rate", type=float, help="fraction of calls answered with 429")
+    ap.add_argument("--outputs", help="JSON file with canned outputs keyed by coach/grade/checklist/exam")
+    args = ap.parse_args(argv)
+
+    changes = {k: v for k, v in vars(args).items() if k not in ("host", "port") and v is not None}
+    try:
+        configure(**changes)
+    except (ValueError, OSError) as e:
+        ap.error(str(e))
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# governor.py
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from settings import env_str, env_float
+
+# -------------------------
+# Admission control for model calls
+# One token bucket per model name (upstream rate limits are per model). Callers that find
+# the bucket empty wait in a bounded queue ordered by priority, so live coaching is served
+# before after-call grading, which is served before batch jobs.
+# Buckets live in process memory: each uvicorn worker and each `manage.py regrade` run has its
+# own full MODEL_RPM budget, and the priorities only order calls within one process. Give each
+# process its share of the upstream limit (e.g. MODEL_RPM=gpt-4o-mini=100 manage.py regrade ...).
+# -------------------------
+COACH = 0
+GRADE = 1
+BATCH = 2
+PRIORITY_NAMES = {COACH: "coach", GRADE: "grade", BATCH: "batch"}
+
+MODEL_RPM_DEFAULT = env_float("MODEL_RPM_DEFAULT", 500.0)
+MODEL_BURST = env_float("MODEL_BURST", 20.0)
+MODEL_QUEUE_MAX = int(env_float("MODEL_QUEUE_MAX", 64))
+# Longest a caller may wait for admission before it is refused (429 / Retry-After)
+MAX_WAIT_S = {
+    COACH: env_float("MODEL_MAX_WAIT_COACH_S", 1.0),
+    GRADE: env_float("MODEL_MAX_WAIT_GRADE_S", 60.0),
+    BATCH: env_float("MODEL_MAX_WAIT_BATCH_S", 600.0),
+}
+
+
+def _parse_rpm(spec: str) -> Dict[str, float]:
+    """MODEL_RPM="gpt-4o-mini=500,gpt-4o=60" -> per-model requests per minute."""
+    out: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        try:
+            out[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return out
+
+
+MODEL_RPM = _parse_rpm(env_str("MODEL_RPM", ""))
+
+# Lets a batch job demote every model call made under it (see priority())
+_priority_floor: contextvars.ContextVar[int] = contextvars.ContextVar("model_priority_floor", default=COACH)
+
+
+class Saturated(Exception):
+    """The model's queue is full or the wait would exceed the caller's budget."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Model {model} is busy; retry in {retry_after:.0f}s")
+        self.model = model
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class _Bucket:
+    def __init__(self, model: str, rpm: float, burst: float, queue_max: int):
+        self.model = model
+        self.rate = max(rpm, 0.001) / 60.0
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.queue_max = queue_max
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {
+            p: {"admitted": 0, "rejected": 0, "wait_ms_sum": 0.0, "wait_ms_max": 0.0} for p in PRIORITY_NAMES
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _live(self) -> List[Tuple[int, int, asyncio.Future]]:
+        return [w for w in self._waiters if not w[2].done()]
+
+    def eta(self, priority: int) -> float:
+        """Seconds until a new caller at this priority would be admitted."""
+        self._refill()
+        ahead = sum(1 for p, _, f in self._waiters if p <= priority and not f.done())
+        return max(0.0, (ahead + 1 - self.tokens) / self.rate)
+
+    def check(self, priority: int) -> Optional[float]:
+        """None if a caller would be admitted in time, else the suggested retry-after."""
+        live = len(self._live())
+        wait = self.eta(priority)
+        if live >= self.queue_max or wait > MAX_WAIT_S[priority]:
+            return max(wait, 1.0)
+        return None
+
+    async def acquire(self, priority: int):
+        t0 = time.monotonic()
+        self._refill()
+        if not self._live() and self.tokens >= 1:
+            self.tokens -= 1
+            self._record(priority, t0)
+            return
+        retry = self.check(priority)
+        if retry is not None:
+            self.stats[priority]["rejected"] += 1
+            raise Saturated(self.model, retry)
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=MAX_WAIT_S[priority])
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                self._record(priority, t0)  # admitted at the very last moment
+                return
+            fut.cancel()
+            self.stats[priority]["rejected"] += 1
+            raise Saturated(self.model, self.eta(priority))
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.tokens += 1  # admitted but the caller went away: give the token back
+            fut.cancel()
+            raise
+        self._record(priority, t0)
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            self.tokens -= 1
+            fut.set_result(None)
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self._waiters and self._timer is None:
+            delay = (1 - self.tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.001), self._dispatch)
+
+    def _record(self, priority: int, t0: float):
+        ms = (time.monotonic() - t0) * 1000.0
+        st = self.stats[priority]
+        st["admitted"] += 1
+        st["wait_ms_sum"] += ms
+        st["wait_ms_max"] = max(st["wait_ms_max"], ms)
+
+    def metrics(self) -> Dict[str, Any]:
+        self._refill()
+        live = self._live()
+        out: Dict[str, Any] = {
+            "rpm": round(self.rate * 60.0, 1),
+            "burst": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "queue_depth": len(live),
+            "queue_max": self.queue_max,
+        }
+        for p, name in PRIORITY_NAMES.items():
+            st = self.stats[p]
+            out[name] = {
+                "waiting": sum(1 for w in live if w[0] == p),
+                "admitted": st["admitted"],
+                "rejected": st["rejected"],
+                "wait_ms_avg": round(st["wait_ms_sum"] / st["admitted"], 1) if st["admitted"] else 0.0,
+                "wait_ms_max": round(st["wait_ms_max"], 1),
+            }
+        return out
+
+
+_buckets: Dict[str, _Bucket] = {}
+
+
+def _bucket(model: str) -> _Bucket:
+    b = _buckets.get(model)
+    if b is None:
+        b = _Bucket(model, MODEL_RPM.get(model, MODEL_RPM_DEFAULT), MODEL_BURST, MODEL_QUEUE_MAX)
+        _buckets[model] = b
+    return b
+
+
+def effective_priority(priority: int) -> int:
+    return max(priority, _priority_floor.get())
+
+
+@asynccontextmanager
+async def admit(model: str, priority: int):
+    """Waits for the model's budget (raises Saturated instead of waiting too long)."""
+    await _bucket(model).acquire(effective_priority(priority))
+    yield
+
+
+def saturated(model: str, priority: int) -> Optional[float]:
+    """Cheap pre-check for endpoints that queue work: retry-after seconds, or None if admissible."""
+    return _bucket(model).check(effective_priority(priority))
+
+
+@contextmanager
+def priority(floor: int):
+    """Every model call inside runs at no better than floor (e.g. BATCH for re-grading)."""
+    token = _priority_floor.set(floor)
+    try:
+        yield
+    finally:
+        _priority_floor.reset(token)
+
+
+def governor_metrics() -> Dict[str, Any]:
+    return {model: b.metrics() for model, b in _buckets.items()}
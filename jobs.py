@@ -0,0 +1,262 @@
+# jobs.py
+import asyncio
+import json
+import os
+import random
+import socket
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from evaluation import evaluate_checklist, grade_exam, grade_exam_single_pass
+from governor import Saturated
+from settings import GRADE_DEADLINE_S, GRADE_SINGLE_PASS, env_float
+from storage import (
+    claim_attempt,
+    complete_attempt,
+    fail_attempt,
+    get_attempt,
+    pending_attempt_ids,
+    release_attempt,
+    reset_failed_attempt,
+)
+
+# -------------------------
+# Background after-call evaluation
+# /aftercall and /grade save a "pending" attempt and return; the evaluation runs here and
+# publishes progress events ("grade", "checklist", then "done" or "error") to the report
+# page's SSE stream (/attempt/{id}/events).
+# Every worker process runs this; an evaluation first takes a lease on the attempt row
+# (storage.claim_attempt), so a worker resuming pending attempts skips the ones another
+# worker is still running. Leases of a crashed worker lapse and the periodic sweep resumes them.
+# Storage calls here are blocking SQLite work and go through asyncio.to_thread.
+# -------------------------
+RESUME_CONCURRENCY = int(env_float("EVAL_RESUME_CONCURRENCY", 4))
+EVAL_LEASE_S = env_float("EVAL_LEASE_S", GRADE_DEADLINE_S + 30.0)
+EVAL_SWEEP_S = env_float("EVAL_SWEEP_S", 60.0)  # 0 => resume only at startup
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_tasks: Dict[int, asyncio.Task] = {}
+_sweeper: Optional[asyncio.Task] = None
+_deferred = {"count": 0}
+_listeners: Dict[int, Set[asyncio.Queue]] = {}
+_on_finished: List[Callable[[int], None]] = []
+
+
+def on_finished(fn: Callable[[int], None]):
+    """fn(attempt_id) runs after an evaluation is stored (e.g. report cache invalidation)."""
+    _on_finished.append(fn)
+
+
+def subscribe(attempt_id: int) -> asyncio.Queue:
+    q: asyncio.Queue = asyncio.Queue(maxsize=16)
+    _listeners.setdefault(attempt_id, set()).add(q)
+    return q
+
+
+def unsubscribe(attempt_id: int, q: asyncio.Queue):
+    qs = _listeners.get(attempt_id)
+    if qs is not None:
+        qs.discard(q)
+        if not qs:
+            _listeners.pop(attempt_id, None)
+
+
+def _publish(attempt_id: int, event: str, data: Dict[str, Any]):
+    for q in list(_listeners.get(attempt_id, ())):
+        try:
+            q.put_nowait((event, data))
+        except asyncio.QueueFull:
+            pass  # a stalled reader re-checks the stored status on its next ping
+
+
+def is_running(attempt_id: int) -> bool:
+    return attempt_id in _tasks
+
+
+def start_evaluation(attempt_id: int, mode: str, transcript: str, gate: Optional[asyncio.Semaphore] = None):
+    if attempt_id in _tasks:
+        return
+    task = asyncio.create_task(_evaluate(attempt_id, mode, transcript, gate))
+    _tasks[attempt_id] = task
+    task.add_done_callback(lambda _t: _tasks.pop(attempt_id, None))
+
+
+def _load_for_evaluation(attempt_id: int) -> Optional[Dict[str, Any]]:
+    return get_attempt(attempt_id, fields=("id", "mode", "transcript", "call_id"))
+
+
+async def resume_pending() -> int:
+    """Re-runs pending evaluations no worker holds (interrupted by a restart or crash). Returns how many."""
+    gate = asyncio.Semaphore(max(1, RESUME_CONCURRENCY))
+    ids = [i for i in await asyncio.to_thread(pending_attempt_ids) if i not in _tasks]
+    for attempt_id in ids:
+        a = await asyncio.to_thread(_load_for_evaluation, attempt_id)
+        if a:
+            start_evaluation(attempt_id, a.get("mode") or "training", a.get("transcript") or "", gate)
+    return len(ids)
+
+
+async def reevaluate(attempt_id: int) -> bool:
+    """Restarts a failed evaluation (error -> pending). False if the attempt is not in error."""
+    if not await asyncio.to_thread(reset_failed_attempt, attempt_id):
+        return False
+    a = await asyncio.to_thread(_load_for_evaluation, attempt_id) or {}
+    start_evaluation(attempt_id, a.get("mode") or "training", a.get("transcript") or "")
+    return True
+
+
+async def _sweep():
+    while True:
+        await asyncio.sleep(EVAL_SWEEP_S)
+        try:
+            await resume_pending()
+        except Exception:
+            pass  # e.g. database busy; next sweep
+
+
+async def start_jobs() -> int:
+    """App startup: resumes pending evaluations and starts the periodic sweep. Returns how many resumed."""
+    global _sweeper
+    if EVAL_SWEEP_S > 0 and _sweeper is None:
+        _sweeper = asyncio.create_task(_sweep())
+    return await resume_pending()
+
+
+async def stop_jobs():
+    """App shutdown: cancels running evaluations, which release their leases for the next worker."""
+    global _sweeper
+    tasks = list(_tasks.values()) + ([_sweeper] if _sweeper is not None else [])
+    _sweeper = None
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def running_metrics() -> Dict[str, Any]:
+    return {
+        "running": len(_tasks),
+        "subscribers": sum(len(v) for v in _listeners.values()),
+        "deferred_busy": _deferred["count"],
+    }
+
+
+async def _evaluate(attempt_id: int, mode: str, transcript: str, gate: Optional[asyncio.Semaphore]):
+    if gate is None:
+        await _evaluate_claimed(attempt_id, mode, transcript)
+    else:
+        async with gate:
+            await _evaluate_claimed(attempt_id, mode, transcript)
+
+
+async def _evaluate_claimed(attempt_id: int, mode: str, transcript: str):
+    if not await asyncio.to_thread(claim_attempt, attempt_id, WORKER_ID, EVAL_LEASE_S):
+        return  # another worker is on it, or it is no longer pending
+    try:
+        result = await _run_admitted(attempt_id, mode, transcript)
+        if result is None:
+            return  # lease lost while waiting for the grader; the new holder finishes it
+    except asyncio.CancelledError:
+        await asyncio.to_thread(release_attempt, attempt_id, WORKER_ID)  # shutdown: stays pending for the next worker
+        raise
+    except asyncio.TimeoutError:
+        await _finish(attempt_id, "error", {"detail": "Evaluation took too long."})
+    except Exception as e:
+        await _finish(attempt_id, "error", {"detail": str(e) or "Evaluation failed"})
+    else:
+        await _finish(attempt_id, "done", result)
+
+
+async def _run_admitted(attempt_id: int, mode: str, transcript: str) -> Optional[Dict[str, Any]]:
+    """
+    _run within GRADE_DEADLINE_S. The /aftercall and /grade pre-check admits nothing, so a
+    burst can still find the grader saturated here: that is not a failure, the attempt stays
+    pending (lease renewed) and is retried after Retry-After. A retry keeps the parts already
+    produced (and published) and redoes only the rest. None if the lease was lost.
+    """
+    parts: Dict[str, Dict[str, Any]] = {}
+    while True:
+        try:
+            return await asyncio.wait_for(_run(attempt_id, mode, transcript, parts), timeout=GRADE_DEADLINE_S)
+        except Saturated as e:
+            _deferred["count"] += 1
+            wait = e.retry_after * random.uniform(1.0, 1.5)  # jitter: deferred attempts do not return in lockstep
+            if not await asyncio.to_thread(claim_attempt, attempt_id, WORKER_ID, wait + EVAL_LEASE_S):
+                return None
+            await asyncio.sleep(wait)
+
+
+async def _finish(attempt_id: int, status: str, data: Dict[str, Any]):
+    try:
+        if status == "done":
+            await asyncio.to_thread(complete_attempt, attempt_id, data)
+        else:
+            await asyncio.to_thread(fail_attempt, attempt_id, data["detail"])
+    except Exception as e:
+        status, data = "error", {"detail": f"Could not store the evaluation: {e}"}
+        try:
+            await asyncio.to_thread(fail_attempt, attempt_id, data["detail"])
+        except Exception:
+            pass  # still pending: the sweep re-runs it once the lease lapses
+    for fn in _on_finished:
+        fn(attempt_id)
+    _publish(attempt_id, status, {"status": status, **({"detail": data["detail"]} if status == "error" else {})})
+
+
+async def _run(attempt_id: int, mode: str, transcript: str, parts: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """parts: "grade"/"checklist" outputs of an earlier try of this attempt, filled in as they land."""
+    if mode != "exam":
+        report = await _part(parts, "checklist", lambda: evaluate_checklist(transcript),
+                             lambda c: _publish_checklist(attempt_id, c))
+        return result_fields(None, report)
+
+    if GRADE_SINGLE_PASS and not parts:
+        parts["grade"], parts["checklist"] = await grade_exam_single_pass(transcript)
+        _publish_grade(attempt_id, parts["grade"])
+        _publish_checklist(attempt_id, parts["checklist"])
+    # Both settle before a Saturated propagates, so whichever part finished is kept for the retry
+    results = await asyncio.gather(
+        _part(parts, "grade", lambda: grade_exam(transcript), lambda g: _publish_grade(attempt_id, g)),
+        _part(parts, "checklist", lambda: evaluate_checklist(transcript), lambda c: _publish_checklist(attempt_id, c)),
+        return_exceptions=True,
+    )
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
+    return result_fields(*results)
+
+
+def result_fields(grade: Optional[Dict[str, Any]], checklist: Dict[str, Any]) -> Dict[str, Any]:
+    """Attempt columns for a grade (exam only; None for training) and a checklist report."""
+    out = {
+        "checklist_score": int(checklist.get("checklist_score", 0) or 0),
+        "checklist_json": json.dumps(checklist, ensure_ascii=False),
+    }
+    if grade is not None:
+        out.update({
+            "score": int(grade.get("score", 0) or 0),
+            "passed": 1 if grade.get("pass") else 0,
+            "summary": grade.get("summary", ""),
+            "strengths": json.dumps(grade.get("strengths", []), ensure_ascii=False),
+            "improvements": json.dumps(grade.get("improvements", []), ensure_ascii=False),
+        })
+    return out
+
+
+async def _part(parts: Dict[str, Dict[str, Any]], name: str, make: Callable, publish: Callable) -> Dict[str, Any]:
+    if name not in parts:
+        out = await make()
+        parts[name] = out
+        publish(out)
+    return parts[name]
+
+
+def _publish_checklist(attempt_id: int, checklist: Dict[str, Any]):
+    _publish(attempt_id, "checklist", {"checklist_score": int(checklist.get("checklist_score", 0) or 0)})
+
+
+def _publish_grade(attempt_id: int, grade: Dict[str, Any]):
+    _publish(attempt_id, "grade", {
+        "score": int(grade.get("score", 0) or 0),
+        "pass": bool(grade.get("pass")),
+        "summary": grade.get("summary", ""),
+    })
@@ -0,0 +1,82 @@
+# manage.py
+import argparse
+import asyncio
+import json
+
+import storage
+
+
+def _add_filters(p: argparse.ArgumentParser):
+    p.add_argument("--user", dest="user_email", help="only this trainee (email)")
+    p.add_argument("--mode", choices=["training", "exam"])
+    p.add_argument("--level", choices=["easy", "medium", "hard"])
+    p.add_argument("--from", dest="created_from", help="created at or after (ISO date/time, UTC)")
+    p.add_argument("--before", dest="created_before", help="created before (ISO date/time, UTC)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="CallCoach maintenance commands")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rebuild-fts", help="Re-index every attempt for full-text search")
+
+    rg = sub.add_parser("regrade", help="Re-run grading over stored attempts into a new evaluation run")
+    _add_filters(rg)
+    rg.add_argument("--label", default="", help="free-text note stored with the run")
+    rg.add_argument("--resume", type=int, metavar="RUN_ID", help="continue an interrupted run instead of starting one")
+    rg.add_argument("--retry-errors", action="store_true", help="with --resume: also redo attempts that failed")
+    rg.add_argument("--force", action="store_true",
+                    help="with --resume: continue even though the rubric changed (the run then mixes two rubrics)")
+    rg.add_argument("--workers", type=int, default=4, help="concurrent evaluations (default 4)")
+    rg.add_argument("--rate", type=float, default=60.0, help="max attempts started per minute, 0 = unlimited (default 60)")
+    rg.add_argument("--dry-run", action="store_true", help="only report how many attempts would be re-graded")
+
+    sub.add_parser("regrade-runs", help="List evaluation runs with their progress")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "rebuild-fts":
+        storage.init_db()
+        n = storage.rebuild_search_index()
+        print(f"Indexed {n} attempts.")
+
+    elif args.cmd == "regrade":
+        storage.init_db()
+        from regrade import rubric_version, run_regrade, start_run  # needs the OpenAI settings
+
+        if args.resume:
+            run = storage.get_evaluation_run(args.resume)
+            if not run:
+                ap.error(f"unknown run {args.resume}")
+            if run["rubric_version"] != rubric_version():
+                if not args.force:
+                    ap.error(f"run {run['run_id']} was started with rubric {run['rubric_version']}, but the "
+                             f"current prompts are {rubric_version()}; start a new run (or pass --force)")
+                print(f"warning: run {run['run_id']} was started with rubric {run['rubric_version']}, "
+                      f"continuing with {rubric_version()} (--force)")
+        elif args.dry_run:
+            filters = {k: getattr(args, k) for k in ("user_email", "mode", "level", "created_from", "created_before")}
+            n = sum(1 for a in storage.iter_attempts(**filters) if a.get("status") == "done")
+            print(f"{n} attempts would be re-graded (rubric {rubric_version()}).")
+            return
+        else:
+            run = start_run(
+                label=args.label, user_email=args.user_email, mode=args.mode, level=args.level,
+                created_from=args.created_from, created_before=args.created_before,
+            )
+            print(f"Started run {run['run_id']}: {run['total']} attempts, rubric {run['rubric_version']}")
+
+        run = asyncio.run(run_regrade(run["run_id"], workers=args.workers, per_minute=args.rate,
+                                      retry_errors=args.retry_errors))
+        print(json.dumps(run["progress"]))
+
+    elif args.cmd == "regrade-runs":
+        storage.init_db()
+        for run in storage.list_evaluation_runs():
+            p = run["progress"]
+            state = "finished" if run["finished_at"] else "open"
+            print(f"{run['run_id']:>5}  {run['created_at']}  {state:<8}  rubric {run['rubric_version']}  "
+                  f"{p['done']}/{run['total']} done, {p['error']} errors  {run['label']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,147 @@
 # openai_realtime.py
+import asyncio
 import json
-import requests
+import time
+from typing import Dict, Optional, Tuple
 
-from settings import env_str, REALTIME_MODEL, ASR_MODEL, ASR_LANGUAGE, VOICE
+import httpx
 
+from settings import env_str, env_float, OPENAI_BASE_URL, REALTIME_MODEL, ASR_MODEL, ASR_LANGUAGE, VOICE
 
-def webrtc_answer_sdp(offer_sdp: str, instructions: str) -> str:
+REALTIME_URL = f"{OPENAI_BASE_URL}/realtime/calls"
+PREWARM_URL = f"{OPENAI_BASE_URL}/models"
+
+SDP_TIMEOUT_S = env_float("SDP_TIMEOUT_S", 60.0)
+SDP_POOL_SIZE = int(env_float("SDP_POOL_SIZE", 32))
+SDP_PREWARM_CONNECTIONS = int(env_float("SDP_PREWARM_CONNECTIONS", 4))
+SDP_KEEPALIVE_S = env_float("SDP_KEEPALIVE_S", 45.0)  # 0 => no periodic re-warm
+
+_http: Optional[httpx.AsyncClient] = None
+_keepalive_task: Optional[asyncio.Task] = None
+
+# Aggregated per-phase timings (ms) for /admin/api/metrics
+_PHASES = ("connect", "send", "wait", "read", "total")
+_stats = {
+    "calls": 0,
+    "errors": 0,
+    "reused_connections": 0,
+    "sum_ms": {p: 0.0 for p in _PHASES},
+    "max_ms": {p: 0.0 for p in _PHASES},
+}
+
+
+def _new_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=SDP_POOL_SIZE,
+        max_keepalive_connections=SDP_POOL_SIZE,
+        keepalive_expiry=max(SDP_KEEPALIVE_S * 2, 30.0),
+    )
+    timeout = httpx.Timeout(SDP_TIMEOUT_S, connect=10.0)
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+async def _prewarm(n: int):
+    """Opens up to n keep-alive connections so the first call setups skip TCP+TLS."""
+    api_key = env_str("OPENAI_API_KEY", "").strip()
+    if _http is None or not api_key or n <= 0:
+        return
+    headers = {"Authorization": f"Bearer {api_key}"}
+
+    async def one():
+        try:
+            await _http.head(PREWARM_URL, headers=headers)
+        except Exception:
+            pass
+
+    await asyncio.gather(*(one() for _ in range(n)))
+
+
+async def _keepalive_loop():
+    while True:
+        await asyncio.sleep(SDP_KEEPALIVE_S)
+        await _prewarm(SDP_PREWARM_CONNECTIONS)
+
+
+async def open_pool():
+    """Called at app startup: creates the shared client and warms its connections."""
+    global _http, _keepalive_task
+    if _http is not None:
+        return
+    _http = _new_client()
+    await _prewarm(SDP_PREWARM_CONNECTIONS)
+    if SDP_KEEPALIVE_S > 0:
+        _keepalive_task = asyncio.create_task(_keepalive_loop())
+
+
+async def close_pool():
+    global _http, _keepalive_task
+    if _keepalive_task is not None:
+        _keepalive_task.cancel()
+        _keepalive_task = None
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+class _PhaseTrace:
+    """httpx trace hook: records when each request phase starts/ends."""
+
+    def __init__(self):
+        self.marks: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: dict):
+        self.marks[event_name.split(".", 1)[-1]] = time.perf_counter()
+
+    def _span(self, start: str, end: str) -> float:
+        a = self.marks.get(start)
+        b = self.marks.get(end)
+        if a is None or b is None:
+            return 0.0
+        return max(0.0, (b - a) * 1000.0)
+
+    def timings(self, t0: float, t_end: float) -> Dict[str, float]:
+        connect_end = "start_tls.complete" if "start_tls.complete" in self.marks else "connect_tcp.complete"
+        return {
+            "connect": self._span("connect_tcp.started", connect_end),
+            "send": self._span("send_request_headers.started", "send_request_body.complete"),
+            "wait": self._span("receive_response_headers.started", "receive_response_headers.complete"),
+            "read": self._span("receive_response_body.started", "receive_response_body.complete"),
+            "total": max(0.0, (t_end - t0) * 1000.0),
+        }
+
+
+def _record(timings: Dict[str, float], ok: bool):
+    _stats["calls"] += 1
+    if not ok:
+        _stats["errors"] += 1
+        return
+    if timings["connect"] == 0.0:
+        _stats["reused_connections"] += 1
+    for p in _PHASES:
+        v = timings.get(p, 0.0)
+        _stats["sum_ms"][p] += v
+        _stats["max_ms"][p] = max(_stats["max_ms"][p], v)
+
+
+def sdp_metrics() -> Dict[str, object]:
+    ok = _stats["calls"] - _stats["errors"]
+    return {
+        "calls": _stats["calls"],
+        "errors": _stats["errors"],
+        "reused_connections": _stats["reused_connections"],
+        "avg_ms": {p: round(_stats["sum_ms"][p] / ok, 2) if ok else 0.0 for p in _PHASES},
+        "max_ms": {p: round(_stats["max_ms"][p], 2) for p in _PHASES},
+        "pool_size": SDP_POOL_SIZE,
+    }
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{p};dur={timings.get(p, 0.0):.1f}" for p in _PHASES)
+
+
+async def webrtc_answer_sdp(offer_sdp: str, instructions: str) -> Tuple[str, Dict[str, float]]:
     """
-    Sends a browser SDP offer to OpenAI Realtime and returns the SDP answer.
+    Sends a browser SDP offer to OpenAI Realtime and returns (SDP answer, phase timings in ms).
     Uses multipart form-data fields: sdp + session
     """
     api_key = env_str("OPENAI_API_KEY", "").strip()
@@ -21,7 +155,6 @@ def webrtc_answer_sdp(offer_sdp: str, instructions: str) -> str:
     if not offer_sdp.endswith("\n"):
         offer_sdp += "\n"
 
-    url = "https://api.openai.com/v1/realtime/calls"
     headers = {"Authorization": f"Bearer {api_key}"}
 
     audio_input = {"transcription": {"model": ASR_MODEL}}
@@ -44,8 +177,21 @@ def webrtc_answer_sdp(offer_sdp: str, instructions: str) -> str:
         "session": (None, json.dumps(session), "application/json"),
     }
 
-    resp = requests.post(url, headers=headers, files=files, timeout=60)
+    if _http is None:
+        await open_pool()
+
+    trace = _PhaseTrace()
+    t0 = time.perf_counter()
+    try:
+        resp = await _http.post(REALTIME_URL, headers=headers, files=files, extensions={"trace": trace})
+    except Exception:
+        _record({}, ok=False)
+        raise
+    timings = trace.timings(t0, time.perf_counter())
+
     if resp.status_code not in (200, 201):
+        _record(timings, ok=False)
         raise RuntimeError(f"OpenAI realtime error {resp.status_code}: {resp.text}")
 
-    return resp.text
+    _record(timings, ok=True)
+    return resp.text, timings
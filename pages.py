@@ -359,7 +359,13 @@ WEBRTC_JS = r"""
   let pc = null;
   let micStream = null;
   let transcriptLines = [];
-  let transcriptChanged = false;
+
+  // Turns streamed to the server while the call runs (see /calls/{id}/turns)
+  let callId = null;
+  let turnSeq = 0;
+  let pendingTurns = [];
+  let turnsFlushing = null;
+  let allTurns = [];         // allTurns[i].seq === i
 
   // For customer deltas
   let custDelta = "";
@@ -379,7 +385,10 @@ WEBRTC_JS = r"""
     const t = (text || "").trim();
     if(!t) return;
     transcriptLines.push(`${role}: ${t}`);
-    transcriptChanged = true;
+    const turn = { seq: turnSeq++, role, text: t, at: new Date().toISOString() };
+    allTurns.push(turn);
+    pendingTurns.push(turn);
+    flushTurns();
 
     const box = document.getElementById("transcriptBox");
     if(box){
@@ -392,6 +401,42 @@ WEBRTC_JS = r"""
     return transcriptLines.join("\n").trim();
   }
 
+  async function flushTurns(){
+    if(!callId || !pendingTurns.length) return;
+    if(turnsFlushing) return turnsFlushing;
+    turnsFlushing = (async () => {
+      try{
+        while(pendingTurns.length){
+          const batch = pendingTurns.slice(0, 50);
+          const r = await fetch(`/calls/${encodeURIComponent(callId)}/turns`, {
+            method: "POST",
+            headers: {"Content-Type":"application/json"},
+            body: JSON.stringify({ turns: batch })
+          });
+          if(!r.ok) return;
+          const data = await r.json();
+          const ack = (typeof data.ack_seq === "number") ? data.ack_seq : -1;
+          pendingTurns = pendingTurns.filter(x => x.seq > ack);
+          if(batch.length && batch[batch.length - 1].seq > ack) return;
+        }
+      }catch(e){
+        // keep pending turns; next flush retries
+      }finally{
+        turnsFlushing = null;
+      }
+    })();
+    return turnsFlushing;
+  }
+
+  // Body for /aftercall and /grade: only the call id once every turn is on the server
+  async function finishPayload(){
+    if(callId){
+      await flushTurns();
+      if(!pendingTurns.length) return { call_id: callId };
+    }
+    return { transcript: fullTranscript() };
+  }
+
   async function waitIceComplete(pc){
     if(pc.iceGatheringState === "complete") return;
     await new Promise((resolve) => {
@@ -486,6 +531,12 @@ WEBRTC_JS = r"""
       });
       const answerSdp = await resp.text();
       if(!resp.ok) throw new Error(answerSdp || "Session failed");
+      callId = resp.headers.get("X-Call-Id");
+      turnSeq = 0;
+      pendingTurns = [];
+      allTurns = [];
+      coachAckSeq = -1;
+      openCoachWs();
 
       await pc.setRemoteDescription({ type: "answer", sdp: answerSdp });
 
@@ -505,6 +556,11 @@ WEBRTC_JS = r"""
 
   function stopCall(){
     try{
+      clearTimeout(coachWsRetry);
+      clearInterval(coachWsPing);
+      const ws = coachWsLatest || coachWs;
+      coachWsLatest = null; coachWs = null;
+      if(ws) ws.close();
       if(pc){ pc.close(); pc = null; }
       if(micStream){
         micStream.getTracks().forEach(t => t.stop());
@@ -521,7 +577,24 @@ WEBRTC_JS = r"""
   // Coach toast (training only)
   let shownTags = new Set();       // "opening", "empathy", ...
   let shownTips = new Set();       // exact tip string
-  let coachBusy = false;
+
+  // Coach runs on finalized turns (debounced). A newer turn aborts the in-flight request,
+  // whose tip would describe a stale state; each request carries only turns after coachAckSeq.
+  const COACH_DEBOUNCE_MS = { customer_turn: 250, agent_turn: 900 };
+  let coachAckSeq = -1;
+  let coachTimer = null;
+  let coachCtrl = null;
+
+  // Preferred channel: /coach/ws (tips are pushed). Falls back to HTTP while closed.
+  // A ping keeps the socket under the server's idle timeout (COACH_WS_IDLE_S, 120s) through
+  // quiet stretches; a dropped socket is reopened with backoff for as long as the call runs.
+  const COACH_WS_PING_MS = 30000;
+  let coachWs = null;
+  let coachWsLatest = null;
+  let coachWsPing = null;
+  let coachWsRetry = null;
+  let coachWsBackoff = 1000;
+  let wsSentSeq = -1;
 
   function showToast(titleTag, tip){
     const wrap = document.getElementById("toastWrap");
@@ -537,52 +610,120 @@ WEBRTC_JS = r"""
     setTimeout(()=> toast.classList.remove("show"), 3200);
   }
 
-  async function maybeCoach(){
-    const coachEnabled = !!document.getElementById("coachEnabled");
-    if(!coachEnabled) return;
-    if(coachBusy) return;
-    if(!transcriptChanged) return;
+  function openCoachWs(){
+    if(!callId || !window.WebSocket || !document.getElementById("coachEnabled")) return;
+    clearTimeout(coachWsRetry);
+    const proto = location.protocol === "https:" ? "wss:" : "ws:";
+    const ws = new WebSocket(`${proto}//${location.host}/coach/ws?call_id=${encodeURIComponent(callId)}`);
+    const forCall = callId;
+    coachWsLatest = ws;
+    ws.onopen = () => {
+      coachWs = ws; wsSentSeq = coachAckSeq; coachWsBackoff = 1000;
+      sendWsTurns();
+      clearInterval(coachWsPing);
+      coachWsPing = setInterval(() => {
+        if(ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify({ type: "ping" }));
+      }, COACH_WS_PING_MS);
+    };
+    ws.onclose = (evt) => {
+      if(coachWs === ws) coachWs = null;
+      if(coachWsLatest !== ws) return;  // superseded by a newer socket
+      coachWsLatest = null;
+      clearInterval(coachWsPing);
+      // 1008: not allowed (no retry); 4001: another page took over this call
+      if(callId !== forCall || evt.code === 1008 || evt.code === 4001) return;
+      coachWsRetry = setTimeout(() => { if(callId === forCall) openCoachWs(); }, coachWsBackoff);
+      coachWsBackoff = Math.min(coachWsBackoff * 2, 30000);
+    };
+    ws.onmessage = (evt) => {
+      let msg = null;
+      try { msg = JSON.parse(evt.data); } catch { return; }
+      if(!msg) return;
+      if(typeof msg.ack_seq === "number") coachAckSeq = msg.ack_seq;
+      if(msg.type === "resync"){ wsSentSeq = msg.ack_seq; sendWsTurns(); return; }
+      if(msg.type === "tip") handleTip(msg);
+    };
+  }
+
+  function sendWsTurns(){
+    if(!coachWs || coachWs.readyState !== WebSocket.OPEN) return false;
+    const turns = allTurns.slice(wsSentSeq + 1).map(x => ({ seq: x.seq, role: x.role, text: x.text }));
+    if(!turns.length) return true;
+    coachWs.send(JSON.stringify({ type: "turns", turns, shown_tags: [...shownTags] }));
+    wsSentSeq = turns[turns.length - 1].seq;
+    return true;
+  }
 
-    coachBusy = true;
-    transcriptChanged = false;
+  function handleTip(data){
+    const should = !!data.should_intervene;
+    const tip = (data.tip || "").trim();
+    const tag = (data.reason_tag || "other").trim();
+    if(!should || !tip) return;
 
-    try{
-      const t = fullTranscript();
-      if(!t) return;
+    // ANTI-REPEAT: show each checklist tag once, and each tip once
+    if(shownTags.has(tag)) return;
+    if(shownTips.has(tip)) return;
 
-      const r = await fetch("/coach", {
-        method:"POST",
-        headers: {"Content-Type":"application/json"},
-        body: JSON.stringify({ transcript: t })
-      });
-      const data = await r.json();
-      if(!r.ok) return;
+    shownTags.add(tag);
+    shownTips.add(tip);
 
-      const should = !!data.should_intervene;
-      const tip = (data.tip || "").trim();
-      const tag = (data.reason_tag || "other").trim();
-      if(!should || !tip) return;
+    showToast(tag, tip);
+  }
 
-      // ANTI-REPEAT: show each checklist tag once, and each tip once
-      if(shownTags.has(tag)) return;
-      if(shownTips.has(tip)) return;
+  function coachOnTurn(kind){
+    if(!document.getElementById("coachEnabled")) return;
+    if(sendWsTurns()) return;
+    if(coachCtrl){ coachCtrl.abort(); coachCtrl = null; }
+    clearTimeout(coachTimer);
+    coachTimer = setTimeout(runCoach, COACH_DEBOUNCE_MS[kind] || 600);
+  }
 
-      shownTags.add(tag);
-      shownTips.add(tip);
+  function coachBody(){
+    if(!callId) return { transcript: fullTranscript() };
+    return {
+      call_id: callId,
+      shown_tags: [...shownTags],
+      turns: allTurns.slice(coachAckSeq + 1).map(x => ({ seq: x.seq, role: x.role, text: x.text })),
+    };
+  }
 
-      showToast(tag, tip);
+  async function postCoach(body, signal){
+    const r = await fetch("/coach", {
+      method:"POST",
+      headers: {"Content-Type":"application/json"},
+      body: JSON.stringify(body),
+      signal
+    });
+    return { ok: r.ok, data: await r.json() };
+  }
+
+  async function runCoach(){
+    coachTimer = null;
+    const ctrl = new AbortController();
+    coachCtrl = ctrl;
+
+    try{
+      let body = coachBody();
+      if(body.turns ? !body.turns.length : !body.transcript) return;
+
+      let { ok, data } = await postCoach(body, ctrl.signal);
+      if(ok && data.resync){
+        // Server lost (or is behind on) this call's turns: resend from what it has
+        coachAckSeq = data.ack_seq;
+        ({ ok, data } = await postCoach(coachBody(), ctrl.signal));
+      }
+      if(!ok || ctrl.signal.aborted) return;
+      if(typeof data.ack_seq === "number") coachAckSeq = data.ack_seq;
+      handleTip(data);
 
     }catch(e){
-      // ignore
+      // aborted by a newer turn, or network error: the next turn retries
     }finally{
-      coachBusy = false;
+      if(coachCtrl === ctrl) coachCtrl = null;
     }
   }
 
-  // throttle coach checks
-  setInterval(maybeCoach, 1200);
-
-  window._rt = { startCall, stopCall, fullTranscript, getLevel };
+  window._rt = { startCall, stopCall, fullTranscript, finishPayload, getLevel, coachOnTurn };
 </script>
 """
 
@@ -669,7 +810,7 @@ TRAINING_LIVE_HTML = """
     await window._rt.startCall({
       level,
       sessionUrl: "/session",
-      onRealtimeEvent: (t) => { /* optional */ }
+      onRealtimeEvent: (t) => window._rt.coachOnTurn(t)
     });
   };
 
@@ -682,10 +823,11 @@ TRAINING_LIVE_HTML = """
       return;
     }
     try{
+      const payload = await window._rt.finishPayload();
       const r = await fetch("/aftercall", {
         method:"POST",
         headers: {"Content-Type":"application/json"},
-        body: JSON.stringify({ transcript: t, level })
+        body: JSON.stringify({ ...payload, level })
       });
       const data = await r.json();
       if(!r.ok) throw new Error(data?.detail || "aftercall failed");
@@ -794,10 +936,11 @@ EXAM_LIVE_HTML = """
       return;
     }
     try{
+      const payload = await window._rt.finishPayload();
       const r = await fetch("/grade", {
         method:"POST",
         headers: {"Content-Type":"application/json"},
-        body: JSON.stringify({ transcript: t, level })
+        body: JSON.stringify({ ...payload, level })
       });
       const data = await r.json();
       if(!r.ok) throw new Error(data?.detail || "grade failed");
@@ -924,43 +1067,173 @@ ADMIN_HTML = """
 
     <div class="card">
       <div class="sectionTitle">Attempts</div>
+      <div class="row">
+        <input id="fEmail" class="field" style="max-width:220px;" placeholder="trainee email" />
+        <select id="fMode" class="field" style="max-width:140px;">
+          <option value="">any mode</option>
+          <option value="training">training</option>
+          <option value="exam">exam</option>
+        </select>
+        <select id="fLevel" class="field" style="max-width:140px;">
+          <option value="">any level</option>
+          <option value="easy">easy</option>
+          <option value="medium">medium</option>
+          <option value="hard">hard</option>
+        </select>
+        <select id="fResult" class="field" style="max-width:140px;">
+          <option value="">any result</option>
+          <option value="pass">pass</option>
+          <option value="fail">fail</option>
+        </select>
+        <input id="fFrom" type="date" class="field" style="max-width:170px;" />
+        <input id="fTo" type="date" class="field" style="max-width:170px;" />
+        <button class="smallbtn" id="applyBtn">Apply</button>
+        <button class="smallbtn" onclick="exportAttempts('ndjson')">Export NDJSON</button>
+        <button class="smallbtn" onclick="exportAttempts('csv')">Export CSV</button>
+      </div>
+      <div style="height:10px;"></div>
       <div class="muted" id="msg">Loading…</div>
       <div style="height:10px;"></div>
       <div id="list"></div>
+      <button class="smallbtn" id="moreBtn" style="display:none;">Load more</button>
+    </div>
+
+    <div style="height:14px;"></div>
+
+    <div class="card">
+      <div class="sectionTitle">Search transcripts & evidence</div>
+      <div class="row">
+        <input id="sQuery" class="field" style="max-width:420px;" placeholder="e.g. that's not my problem" />
+        <select id="sScope" class="field" style="max-width:170px;">
+          <option value="all">transcript + evidence</option>
+          <option value="transcript">transcript</option>
+          <option value="evidence">evidence</option>
+        </select>
+        <button class="smallbtn" id="searchBtn">Search</button>
+      </div>
+      <div style="height:10px;"></div>
+      <div class="muted" id="sMsg"></div>
+      <div id="sList"></div>
+      <button class="smallbtn" id="sMoreBtn" style="display:none;">More results</button>
     </div>
   </div>
 
 <script>
-  async function load(){
+  let nextCursor = null;
+
+  function filterParams(){
+    const p = new URLSearchParams();
+    const add = (k, id) => { const v = (document.getElementById(id).value || "").trim(); if(v) p.set(k, v); };
+    add("user_email", "fEmail");
+    add("mode", "fMode");
+    add("level", "fLevel");
+    add("result", "fResult");
+    add("from", "fFrom");
+    add("to", "fTo");
+    return p;
+  }
+
+  function exportAttempts(format){
+    const p = filterParams();
+    p.set("format", format);
+    p.set("items", "1");
+    window.location.href = "/admin/api/export?" + p.toString();
+  }
+
+  function renderItem(a){
+    const id = a.id;
+    const mode = a.mode || "";
+    const lvl = a.level || "";
+    const user = a.user_email || "";
+    const when = a.created_at || "";
+    const href = (mode === "exam") ? `/exam/report/${id}` : `/training/report/${id}`;
+    return `
+      <div class="mini" style="padding:10px;border:1px solid var(--border);border-radius:14px;margin-bottom:10px;background:rgba(249,250,251,.9);">
+        <div style="font-weight:1000">${mode.toUpperCase()} #${id} <span class="pill">lvl: ${lvl}</span></div>
+        <div class="muted">${user} ${when ? "• " + when : ""}</div>
+        <div style="height:8px;"></div>
+        <button class="smallbtn" onclick="window.location.href='${href}'">Open report</button>
+      </div>
+    `;
+  }
+
+  async function load(reset){
     const msg = document.getElementById("msg");
     const list = document.getElementById("list");
+    const more = document.getElementById("moreBtn");
+    if(reset){
+      nextCursor = null;
+      list.innerHTML = "";
+      msg.textContent = "Loading…";
+    }
     try{
-      const r = await fetch("/admin/api/attempts");
+      const p = filterParams();
+      if(nextCursor) p.set("cursor", nextCursor);
+      const r = await fetch("/admin/api/attempts?" + p.toString());
       const data = await r.json();
       if(!r.ok) throw new Error(data?.detail || "Error");
-      msg.textContent = "";
       const items = data.items || [];
-      list.innerHTML = items.map(a => {
-        const id = a.id;
-        const mode = a.mode || "";
-        const lvl = a.level || "";
-        const user = a.user_email || "";
-        const when = a.created_at || "";
-        const href = (mode === "exam") ? `/exam/report/${id}` : `/training/report/${id}`;
+      list.insertAdjacentHTML("beforeend", items.map(renderItem).join(""));
+      nextCursor = data.next_cursor || null;
+      more.style.display = nextCursor ? "" : "none";
+      msg.textContent = list.children.length ? "" : "No attempts.";
+    }catch(e){
+      msg.textContent = e.message || "Error";
+    }
+  }
+
+  function esc(x){
+    return String(x || "").replace(/&/g,"&amp;").replace(/</g,"&lt;").replace(/>/g,"&gt;");
+  }
+  function markSnippet(x){
+    return esc(x).replace(/\\u0002/g, "<mark>").replace(/\\u0003/g, "</mark>");
+  }
+
+  let searchPage = null;
+
+  async function search(reset){
+    const sMsg = document.getElementById("sMsg");
+    const sList = document.getElementById("sList");
+    const more = document.getElementById("sMoreBtn");
+    const q = (document.getElementById("sQuery").value || "").trim();
+    if(reset){
+      searchPage = 0;
+      sList.innerHTML = "";
+    }
+    if(!q){ sMsg.textContent = ""; more.style.display = "none"; return; }
+    sMsg.textContent = "Searching…";
+    try{
+      const p = new URLSearchParams({ q, scope: document.getElementById("sScope").value, page: searchPage || 0 });
+      const r = await fetch("/admin/api/search?" + p.toString());
+      const data = await r.json();
+      if(!r.ok) throw new Error(data?.detail || "Error");
+      sList.insertAdjacentHTML("beforeend", (data.items || []).map(a => {
+        const href = (a.mode === "exam") ? `/exam/report/${a.id}` : `/training/report/${a.id}`;
+        const snip = a.evidence_snippet && a.evidence_snippet.includes("\\u0002") ? a.evidence_snippet : a.transcript_snippet;
         return `
           <div class="mini" style="padding:10px;border:1px solid var(--border);border-radius:14px;margin-bottom:10px;background:rgba(249,250,251,.9);">
-            <div style="font-weight:1000">${mode.toUpperCase()} #${id} <span class="pill">lvl: ${lvl}</span></div>
-            <div class="muted">${user} ${when ? "• " + when : ""}</div>
+            <div style="font-weight:1000">${esc((a.mode || "").toUpperCase())} #${a.id} <span class="pill">lvl: ${esc(a.level)}</span></div>
+            <div class="muted">${esc(a.user_email)} ${a.created_at ? "• " + esc(a.created_at) : ""}</div>
+            <div style="margin-top:6px;white-space:pre-wrap;">${markSnippet(snip)}</div>
             <div style="height:8px;"></div>
             <button class="smallbtn" onclick="window.location.href='${href}'">Open report</button>
           </div>
         `;
-      }).join("");
+      }).join(""));
+      searchPage = data.next_page;
+      more.style.display = (searchPage !== null && searchPage !== undefined) ? "" : "none";
+      sMsg.textContent = sList.children.length ? "" : "No matches.";
     }catch(e){
-      msg.textContent = e.message || "Error";
+      sMsg.textContent = e.message || "Error";
     }
   }
-  load();
+
+  document.getElementById("searchBtn").onclick = () => search(true);
+  document.getElementById("sQuery").addEventListener("keydown", (e) => { if(e.key === "Enter") search(true); });
+  document.getElementById("sMoreBtn").onclick = () => search(false);
+  document.getElementById("applyBtn").onclick = () => load(true);
+  document.getElementById("moreBtn").onclick = () => load(false);
+  load(true);
 </script>
 </body>
 </html>
@@ -992,7 +1265,93 @@ def _parse_json_any(x):
                 return {}
     return {}
 
+# -------------------------
+# Report placeholder while the evaluation runs (fills in over /attempt/{id}/events)
+# -------------------------
+PENDING_REPORT_HTML = """
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8" />
+  <title>__TITLE__</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  __THEME_CSS__
+</head>
+<body>
+  <div class="wrap">
+    <div class="top">
+      <div class="title">📄 __TITLE__</div>
+      <div class="row">
+        <div class="pill">Level: __LEVEL__</div>
+        <button class="smallbtn" onclick="window.location.href='/app'">Dashboard</button>
+      </div>
+    </div>
+
+    <div class="card">
+      <div class="row" style="justify-content:space-between;">
+        <div class="sectionTitle" id="evalStatus">Evaluating your call…</div>
+        <div class="row">
+          <div class="pill" id="scorePill" style="display:none;"></div>
+          <div class="pill" id="checklistPill">Checklist: …</div>
+        </div>
+      </div>
+      <div style="height:12px;"></div>
+      <div class="card" id="summaryCard" style="display:none;">
+        <div class="sectionTitle">Summary</div>
+        <div class="muted" id="summaryText"></div>
+      </div>
+      <div class="muted" style="margin-top:10px;">This page updates by itself when the report is ready.</div>
+    </div>
+  </div>
+
+<script>
+  (function(){
+    const es = new EventSource("/attempt/__ID__/events");
+    const $ = (id) => document.getElementById(id);
+    es.addEventListener("grade", (e) => {
+      const d = JSON.parse(e.data);
+      $("scorePill").style.display = "";
+      $("scorePill").textContent = `Score: ${d.score} (${d.pass ? "PASS" : "FAIL"})`;
+      if(d.summary){ $("summaryCard").style.display = ""; $("summaryText").textContent = d.summary; }
+    });
+    es.addEventListener("checklist", (e) => {
+      $("checklistPill").textContent = `Checklist: ${JSON.parse(e.data).checklist_score}%`;
+    });
+    const finish = () => { es.close(); window.location.reload(); };
+    es.addEventListener("done", finish);
+    es.addEventListener("error", (e) => {
+      // server "error" event (evaluation failed) carries data; a dropped connection does not
+      if(e.data){ finish(); }
+    });
+  })();
+</script>
+</body>
+</html>
+"""
+
+
+def build_pending_report_html(a: dict, title: str) -> str:
+    return (PENDING_REPORT_HTML
+            .replace("__THEME_CSS__", THEME_CSS)
+            .replace("__TITLE__", _esc(title))
+            .replace("__LEVEL__", _esc(a.get("level", "")))
+            .replace("__ID__", str(int(a["id"]))))
+
+
+def _eval_error_banner(a: dict) -> str:
+    if (a.get("status") or "") != "error":
+        return ""
+    aid = int(a["id"])
+    retry = (f"fetch('/attempt/{aid}/reevaluate',{{method:'POST'}})"
+             ".then(r=>r.ok?location.reload():r.json().then(d=>alert(d.detail||'Try again later.')))")
+    return (f'<div class="card" style="border-color:rgba(220,38,38,.35);margin-bottom:12px;">'
+            f'Evaluation failed: {_esc(a.get("summary") or "")} '
+            f'<button class="btn" onclick="{retry}">Evaluate again</button></div>')
+
+
 def build_training_report_html(a: dict) -> str:
+    if (a.get("status") or "") == "pending":
+        return build_pending_report_html(a, "Training report")
     lvl = _esc(a.get("level",""))
     score = int(a.get("checklist_score", 0) or 0)
     raw = a.get("checklist_json","") or ""
@@ -1049,6 +1408,7 @@ def build_training_report_html(a: dict) -> str:
       </div>
     </div>
 
+    {_eval_error_banner(a)}
     <div class="card">
       <div class="row" style="justify-content:space-between;">
         <div class="sectionTitle">Checklist</div>
@@ -1083,6 +1443,8 @@ def build_training_report_html(a: dict) -> str:
     return html
 
 def build_exam_report_html(a: dict) -> str:
+    if (a.get("status") or "") == "pending":
+        return build_pending_report_html(a, "Exam report")
     lvl = _esc(a.get("level",""))
     score = int(a.get("score", 0) or 0)
     passed = bool(a.get("passed", 0))
@@ -1119,6 +1481,7 @@ def build_exam_report_html(a: dict) -> str:
       </div>
     </div>
 
+    {_eval_error_banner(a)}
     <div class="card">
       <div class="row" style="justify-content:space-between;">
         <div class="{badge}">{'PASS' if passed else 'FAIL'}</div>
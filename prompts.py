@@ -107,7 +107,11 @@ Share ONLY if asked:
 - Phone: 050-123-4567
 Goal:
 - Restore access or get a clear next step and timeframe.
-""".strip()
+""".strip(),
+            # Coach: this customer can only be verified by email/phone
+            "script_rules": {
+                "identification": {"phrases": ["email", "e-mail", "phone", "phone number", "username"]},
+            },
         },
     ],
     "medium": [
@@ -305,6 +309,66 @@ should_intervene=false and tip="".
 """.strip()
 
 
+# -------------------------
+# COACH — Local phrase bank (COACH_TIP_SOURCE=local)
+# Ready-to-say micro-sentences per missing step, same style rules as the prompt above
+# (English, 6–12 words, one tip). Rotated so repeat callers do not see the same line.
+# -------------------------
+COACH_PHRASES = {
+    "opening": [
+        "Say: Hi, my name is ___ from the support team.",
+        "Open with your name, your team, and offer help.",
+        "Try: This is ___ from support, how can I help today?",
+    ],
+    "verification": [
+        "Ask: Could I have your full name or account email?",
+        "Verify first: may I have the email on the account?",
+        "Try: Can you confirm your phone number or customer ID?",
+    ],
+    "empathy": [
+        "Acknowledge it: I'm sorry to hear that, that sounds frustrating.",
+        "Validate first: I understand how annoying this must be.",
+        "Try: I can imagine that's stressful, let's sort it out.",
+    ],
+    "clarify": [
+        "Ask one question: When did this first start happening?",
+        "Clarify with one short question before offering a fix.",
+        "Try: Can you tell me what you see on screen?",
+    ],
+    "restate": [
+        "Restate: Just to confirm, the issue is ___, right?",
+        "Summarize the problem back and check you understood it.",
+        "Try: So you're saying ___, did I get that right?",
+    ],
+    "plan": [
+        "Set expectations: Next, I'll ___ and update you within ___.",
+        "Tell them the next step and when it happens.",
+        "Try: I'll check this now and email you today.",
+    ],
+    "close": [
+        "Recap: To summarize, we ___ and the next step is ___.",
+        "Wrap up with a short recap of what was done.",
+        "Try: Just to summarize, I've ___; anything else I can do?",
+    ],
+    "survey": [
+        "Ask: Would you mind rating this call in a short survey?",
+        "Before goodbye, invite them to leave quick feedback.",
+        "Try: Your feedback helps, you'll get a short survey.",
+    ],
+}
+
+COACH_URGENCY = {
+    "opening": "high",
+    "verification": "medium",
+    "empathy": "high",
+    "clarify": "medium",
+    "restate": "medium",
+    "plan": "medium",
+    "close": "low",
+    "survey": "low",
+}
+
+
 # -------------------------
 # GRADER — Exam scoring (English only)
 # -------------------------
@@ -382,3 +446,24 @@ OUTPUT (STRICT JSON ONLY):
 Rules:
 - Return JSON only. No extra text.
 """.strip()
+
+
+# -------------------------
+# SINGLE-PASS EXAM — grade + checklist in one model call
+# -------------------------
+EXAM_SINGLE_PASS_PROMPT = "\n\n".join([
+    """
+You will evaluate ONE call transcript with TWO instruments and return both results together.
+Apply PART A and PART B independently to the same transcript.
+""".strip(),
+    "PART A — EXAM GRADE\n" + GRADER_RUBRIC,
+    "PART B — CHECKLIST\n" + CHECKLIST_SYSTEM_PROMPT,
+    """
+FINAL OUTPUT (STRICT JSON ONLY — this replaces the output instructions above):
+{
+  "grade": { ...PART A object... },
+  "checklist": { ...PART B object... }
+}
+No extra text.
+""".strip(),
+])
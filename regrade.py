@@ -0,0 +1,144 @@
+# regrade.py
+import asyncio
+import hashlib
+import time
+from typing import Any, Callable, Dict, Optional
+
+from evaluation import evaluate_checklist, grade_exam
+from governor import Saturated, priority, BATCH
+from jobs import result_fields
+from prompts import GRADER_RUBRIC, CHECKLIST_SYSTEM_PROMPT
+from settings import GRADER_MODEL, env_float
+from storage import (
+    create_evaluation_run,
+    finish_evaluation_run,
+    get_attempt,
+    get_evaluation_run,
+    run_work_items,
+    save_run_result,
+)
+
+# -------------------------
+# Batch re-grading of stored attempts (manage.py regrade)
+# Results go to attempt_evaluations under a run_id; each finished attempt is a checkpoint,
+# so an interrupted run resumes with only the attempts still pending.
+# The model governor budget is per process (see governor.py): run this with its own MODEL_RPM
+# share, since the app's live traffic does not see these calls.
+# -------------------------
+REGRADE_MAX_DEFERRALS = int(env_float("REGRADE_MAX_DEFERRALS", 10))
+
+
+def rubric_version() -> str:
+    """Changes whenever the grading prompts or the grader model change."""
+    h = hashlib.sha256()
+    for part in (GRADER_MODEL, GRADER_RUBRIC, CHECKLIST_SYSTEM_PROMPT):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:12]
+
+
+def start_run(label: str = "", **filters) -> Dict[str, Any]:
+    return create_evaluation_run(rubric_version(), GRADER_MODEL, label=label, filters=filters)
+
+
+class RateLimiter:
+    """Global start-rate limit shared by all workers: at most per_minute starts, evenly spaced."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _evaluate_attempt(attempt_id: int) -> Dict[str, Any]:
+    a = get_attempt(attempt_id, fields=("id", "mode", "transcript", "call_id"))
+    if not a:
+        raise LookupError("attempt no longer exists")
+    transcript = a.get("transcript") or ""
+    if (a.get("mode") or "") == "exam":
+        grade, checklist = await asyncio.gather(grade_exam(transcript), evaluate_checklist(transcript))
+        return result_fields(grade, checklist)
+    return result_fields(None, await evaluate_checklist(transcript))
+
+
+def _fmt_eta(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}h{m:02d}m" if h else f"{m}m{s:02d}s"
+
+
+async def run_regrade(
+    run_id: int,
+    workers: int = 4,
+    per_minute: float = 60.0,
+    retry_errors: bool = False,
+    report: Optional[Callable[[str], None]] = print,
+    report_every_s: float = 5.0,
+    max_deferrals: int = REGRADE_MAX_DEFERRALS,
+) -> Dict[str, Any]:
+    """Evaluates the run's remaining attempts; returns the run with final progress counts."""
+    todo = run_work_items(run_id, retry_errors=retry_errors)
+    q: asyncio.Queue = asyncio.Queue()
+    for attempt_id in todo:
+        q.put_nowait(attempt_id)
+
+    limiter = RateLimiter(per_minute)
+    stats = {"done": 0, "error": 0, "deferred": 0}
+    deferrals: Dict[int, int] = {}
+    t0 = time.monotonic()
+    last_report = [t0]
+
+    def progress(force: bool = False):
+        now = time.monotonic()
+        if report is None or (not force and now - last_report[0] < report_every_s):
+            return
+        last_report[0] = now
+        n = stats["done"] + stats["error"]
+        rate = n / (now - t0) * 60.0 if now > t0 else 0.0
+        eta = (len(todo) - n) / rate * 60.0 if rate else 0.0
+        report(f"run {run_id}: {n}/{len(todo)} ({stats['error']} errors) {rate:.1f}/min ETA {_fmt_eta(eta)}")
+
+    async def worker():
+        while True:
+            try:
+                attempt_id = q.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.wait()
+            try:
+                with priority(BATCH):
+                    result = await _evaluate_attempt(attempt_id)
+                save_run_result(run_id, attempt_id, result)
+                stats["done"] += 1
+            except Saturated as e:
+                # This process's budget is exhausted: back off and retry, up to max_deferrals times
+                n = deferrals[attempt_id] = deferrals.get(attempt_id, 0) + 1
+                if n > max_deferrals:
+                    save_run_result(run_id, attempt_id, error=f"model busy after {max_deferrals} retries: {e}")
+                    stats["error"] += 1
+                    progress()
+                    continue
+                stats["deferred"] += 1
+                await asyncio.sleep(e.retry_after)
+                q.put_nowait(attempt_id)
+                continue
+            except Exception as e:
+                save_run_result(run_id, attempt_id, error=str(e) or type(e).__name__)
+                stats["error"] += 1
+            progress()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(workers, len(todo) or 1)))))
+    progress(force=True)
+    finish_evaluation_run(run_id)
+    return get_evaluation_run(run_id)
@@ -0,0 +1,132 @@
+# script_rules.py
+import re
+from typing import Dict, FrozenSet, List, Optional, Pattern, Set
+
+from prompts import TRAINING_SCENARIOS
+
+# -------------------------
+# Call-script checkpoints (matched on lowercase AGENT text)
+# - phrases: regex fragments starting with a letter, word-bounded (use (?:...) for inner groups)
+# - symbols: plain non-word substrings, no word boundaries
+# A scenario can replace any checkpoint via "script_rules" in prompts.TRAINING_SCENARIOS.
+# -------------------------
+DEFAULT_RULES: Dict[str, Dict[str, List[str]]] = {
+    "opening_name": {"phrases": ["my name is", "this is"]},
+    "opening_team": {"phrases": ["team", "support", "from", "company"]},
+    "opening_help": {"phrases": ["how can i help"]},
+    # Identification / verification (asked for name/id/last4/phone/email)
+    "identification": {"phrases": ["name", r"last\s*(?:4|four)", "id", "phone", "phone number", "email"]},
+    "empathy": {"phrases": ["i understand", "i'm sorry", "sorry to hear", "that sounds", "i can imagine", "i appreciate"]},
+    "clarify": {
+        "phrases": ["can you", "could you", "may i", "what", "when", "where", "which", "how"],
+        "symbols": ["?"],
+    },
+    "restate": {"phrases": ["just to confirm", "to confirm", "to make sure i understand", "if i understand", "so you(?:'re| are)"]},
+    "expectations": {"phrases": [
+        "next step", "what i(?:'ll| will) do", "i(?:'ll| will) (?:check|look|review|open|create|email|call)",
+        "within", "today", "tomorrow", "minutes", "hours", "by (?:the end|eod)",
+    ]},
+    "close": {"phrases": ["to summarize", "just to summarize", "summary", "recap"]},
+    "feedback": {"phrases": ["survey", "feedback", "rate", "rating"]},
+    "near_closing": {"phrases": ["anything else", "have a (?:good|nice) day", "goodbye", "bye", "thank you for calling"]},
+}
+
+# -------------------------
+# Tone/control triggers (matched on the latest lowercase AGENT turn): the coach asks the
+# model about tone or control only when one of these fires, or the agent stacks questions.
+# -------------------------
+TONE_TRIGGER_PHRASES: List[str] = [
+    "calm down", "relax", "not my (?:problem|fault|job)", "as i (?:said|told you|already said)",
+    "i already (?:said|told you|explained)", "you(?:'re| are) wrong", "you should(?:'ve| have)",
+    "there(?:'s| is) nothing (?:i|we) can do", "that(?:'s| is) (?:just )?(?:the|our) policy",
+    "listen to me", "whatever", "not possible",
+]
+_TONE_TRIGGER = re.compile(r"\b(?:" + "|".join(TONE_TRIGGER_PHRASES) + r")\b")
+
+
+def tone_trigger(agent_turn: str) -> bool:
+    """Defensive wording, or more than one question at once (the coach prompt's control case)."""
+    text = (agent_turn or "").lower()
+    return text.count("?") >= 2 or bool(_TONE_TRIGGER.search(text))
+
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _branches(rule: Dict[str, List[str]]) -> List[str]:
+    # Trailing \b lives inside each branch so every branch starts with a literal; the
+    # leading word boundary is checked in scan() (see ScriptMatcher).
+    return [p + r"\b" for p in rule.get("phrases") or []] + [re.escape(s) for s in rule.get("symbols") or []]
+
+
+def _whole(rule: Dict[str, List[str]]) -> Pattern:
+    alts = list(rule.get("phrases") or []) + [re.escape(s) for s in rule.get("symbols") or []]
+    return re.compile("(?:" + "|".join(alts) + ")") if alts else re.compile(r"(?!)")
+
+
+class ScriptMatcher:
+    """
+    All checkpoints compiled into one flat alternation. Because every branch starts with
+    a literal, re can skip straight to candidate characters, so one left-to-right pass
+    replaces a separate search per checkpoint. After each hit the pattern is narrowed to
+    the checkpoints still missing (cached per remaining set) and resumes at the same
+    position, so checkpoints overlapping at one spot ("how can i help" / "how") are all found.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, List[str]]]):
+        self.rules = dict(rules)
+        self.keys = tuple(self.rules)
+        self._whole = {k: _whole(r) for k, r in self.rules.items()}
+        self._patterns: Dict[FrozenSet[str], Pattern] = {}
+        self._pattern(frozenset(self.keys))
+
+    def _pattern(self, keys: FrozenSet[str]) -> Pattern:
+        p = self._patterns.get(keys)
+        if p is None:
+            branches = [b for k in self.keys if k in keys for b in _branches(self.rules[k])]
+            p = re.compile("|".join(branches) or r"(?!)")
+            self._patterns[keys] = p
+        return p
+
+    def scan(self, text: str, found: Optional[Set[str]] = None) -> Set[str]:
+        """Adds every checkpoint matching text to found (new set if None) and returns it."""
+        found = set() if found is None else found
+        remaining = frozenset(k for k in self.keys if k not in found)
+        pos = 0
+        while remaining:
+            m = self._pattern(remaining).search(text, pos)
+            if not m:
+                break
+            start, hit = m.start(), m.group()
+            # Leading \b: a word-initial match must not continue a previous word ("did" != "id")
+            if start > 0 and _WORD_CHAR.match(hit) and _WORD_CHAR.match(text[start - 1]):
+                pos = start + 1
+                continue
+            newly = {k for k in remaining if self._whole[k].fullmatch(hit)}
+            if not newly:
+                # A lookaround can't see past the extracted hit; check it in place instead
+                newly = {k for k in remaining if (w := self._whole[k].match(text, start)) and w.end() == m.end()}
+            found |= newly
+            remaining = remaining - newly
+            # Resume at the same spot only while the pattern keeps narrowing, or an
+            # unattributable hit would be found again forever
+            pos = start if newly else start + 1
+        return found
+
+    def complete(self, found: Set[str]) -> bool:
+        return len(found) >= len(self.keys)
+
+
+DEFAULT_MATCHER = ScriptMatcher(DEFAULT_RULES)
+
+# Compiled once at import for every scenario that overrides a checkpoint
+_SCENARIO_MATCHERS: Dict[str, ScriptMatcher] = {
+    s["id"]: ScriptMatcher({**DEFAULT_RULES, **s["script_rules"]})
+    for scenarios in TRAINING_SCENARIOS.values()
+    for s in scenarios
+    if s.get("script_rules")
+}
+
+
+def matcher_for(scenario_id: str = "") -> ScriptMatcher:
+    return _SCENARIO_MATCHERS.get(scenario_id or "", DEFAULT_MATCHER)
@@ -17,10 +17,25 @@ def env_str(name: str, default: str = "") -> str:
     return v.strip().strip('"').strip("'").lstrip("\ufeff")
 
 
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(env_str(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    v = env_str(name, "").lower()
+    if not v:
+        return default
+    return v in {"1", "true", "yes", "on"}
+
+
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
 except Exception:
     OpenAI = None
+    AsyncOpenAI = None
 
 
 # ===== Required =====
@@ -46,9 +61,46 @@ ASR_LANGUAGE = env_str("ASR_LANGUAGE", "")  # "" => omit => auto-detect
 VOICE = env_str("VOICE", "marin")
 
 COACH_MODEL = env_str("COACH_MODEL", "gpt-4o-mini")
+# local => checklist tips come from prompts.COACH_PHRASES (no model call); llm => COACH_MODEL writes them.
+# COACH_TONE_CHECK asks COACH_MODEL about tone/control whenever the latest agent turn trips
+# script_rules.tone_trigger (defensive wording, stacked questions); 0 => checklist tips only.
+COACH_TIP_SOURCE = env_str("COACH_TIP_SOURCE", "local").strip().lower()
+COACH_TONE_CHECK = env_bool("COACH_TONE_CHECK", True)
+# A model-written tip not ready within COACH_DEADLINE_MS is not shown (the model call still
+# finishes in the background and fills the tip cache, counted as "late").
+COACH_DEADLINE_MS = env_float("COACH_DEADLINE_MS", 1500.0)
+# Model-written coach tips are shared across trainees, keyed by script status + missing step +
+# a normalized fingerprint of the recent lines. Entries older than COACH_TIP_CACHE_FRESH_S are
+# still served but refreshed in the background; COACH_TIP_CACHE_SIZE=0 disables the cache.
+COACH_TIP_CACHE_SIZE = int(env_float("COACH_TIP_CACHE_SIZE", 4096))
+COACH_TIP_CACHE_TTL_S = env_float("COACH_TIP_CACHE_TTL_S", 3600.0)
+COACH_TIP_CACHE_FRESH_S = env_float("COACH_TIP_CACHE_FRESH_S", 300.0)
+COACH_SESSION_MAX = int(env_float("COACH_SESSION_MAX", 2000))      # live calls tracked at once
+COACH_SESSION_TTL_S = env_float("COACH_SESSION_TTL_S", 1800.0)    # idle calls are dropped after this
+# /coach/ws: one socket per live call; bounded count, idle sockets are closed
+COACH_WS_MAX = int(env_float("COACH_WS_MAX", 500))
+COACH_WS_IDLE_S = env_float("COACH_WS_IDLE_S", 120.0)
+COACH_WS_MAX_MESSAGE = int(env_float("COACH_WS_MAX_MESSAGE", 256 * 1024))
 GRADER_MODEL = env_str("GRADER_MODEL", "gpt-4o-mini")
 
-client = OpenAI(api_key=OPENAI_API_KEY) if (HAS_KEY and OpenAI is not None) else None
+# /grade: overall deadline for the exam evaluation, and optional single model call
+# returning both the rubric grade and the checklist.
+GRADE_DEADLINE_S = env_float("GRADE_DEADLINE_S", 90.0)
+GRADE_SINGLE_PASS = env_bool("GRADE_SINGLE_PASS", False)
+
+# Attempts are immutable once evaluated: rendered reports are cached per attempt id
+REPORT_CACHE_SIZE = int(env_float("REPORT_CACHE_SIZE", 512))
+
+# Model calls run inside async handlers, so the shared client must never block the event loop.
+OPENAI_TIMEOUT_S = env_float("OPENAI_TIMEOUT_S", 60.0)
+# API root for both the Responses client and the Realtime SDP exchange; point it at
+# fake_openai.py (e.g. http://127.0.0.1:8100/v1) to load-test without spending tokens.
+OPENAI_BASE_URL = (env_str("OPENAI_BASE_URL", "") or "https://api.openai.com/v1").rstrip("/")
+
+client = (
+    AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT_S, base_url=OPENAI_BASE_URL)
+    if (HAS_KEY and AsyncOpenAI is not None) else None
+)
 
 ONBOARDING = {
     "pdf_url": "/static/onboarding.pdf",
@@ -1,11 +1,22 @@
 # storage.py
+import asyncio
+import json
 import os
+import queue
 import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 DB_PATH = Path(os.getenv("APP_DB_PATH", Path(__file__).resolve().parent / "app.db"))
+DB_POOL_SIZE = int(os.getenv("APP_DB_POOL_SIZE", "4"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("APP_DB_BUSY_TIMEOUT_MS", "5000"))
 
 # New columns (added via lightweight migration)
 _EXTRA_COLUMNS = {
@@ -15,90 +26,1061 @@ _EXTRA_COLUMNS = {
     "emotion_level": "INTEGER",
 }
 
-def _conn():
+# Large text columns are stored as zlib BLOBs behind a codec marker; short values stay plain TEXT.
+# Readers accept both, so rows written before compression (or below the threshold) still decode.
+_COMPRESSED_COLUMNS = ("transcript", "checklist_json")
+_CODEC_ZLIB = b"z1:"
+COMPRESS_MIN_BYTES = int(os.getenv("APP_DB_COMPRESS_MIN_BYTES", "256"))
+
+ATTEMPT_FIELDS = (
+    "id", "created_at", "user_email", "mode", "level", "transcript",
+    "score", "passed", "summary", "strengths", "improvements",
+    "checklist_score", "checklist_json", "customer_type", "emotion_level", "call_id", "status",
+)
+# Everything a report page needs; never touches the transcript
+REPORT_FIELDS = tuple(f for f in ATTEMPT_FIELDS if f != "transcript")
+
+# Idle connections kept for reuse (LIFO keeps the hottest connection in front)
+_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+_ready = False
+_init_lock = threading.Lock()
+
+
+def _connect(isolation_level: Optional[str] = "") -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    c = sqlite3.connect(str(DB_PATH))
+    c = sqlite3.connect(
+        str(DB_PATH),
+        timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+        check_same_thread=False,
+        isolation_level=isolation_level,
+    )
     c.row_factory = sqlite3.Row
+    # WAL: readers never block the writer (and vice versa); NORMAL is durable across app crashes in WAL mode
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    c.execute("PRAGMA temp_store=MEMORY")
+    c.execute("PRAGMA cache_size=-8000")
     return c
 
+
+@contextmanager
+def _conn():
+    """Borrows a pooled connection; commits on success, rolls back on error."""
+    init_db()
+    try:
+        con = _pool.get_nowait()
+    except queue.Empty:
+        con = _connect()
+    try:
+        with con:
+            yield con
+    finally:
+        if _pool.qsize() < DB_POOL_SIZE:
+            _pool.put(con)
+        else:
+            con.close()
+
+
 def _ensure_columns(con: sqlite3.Connection):
     cols = {r["name"] for r in con.execute("PRAGMA table_info(attempts)").fetchall()}
     for name, sql_type in _EXTRA_COLUMNS.items():
         if name not in cols:
             con.execute(f"ALTER TABLE attempts ADD COLUMN {name} {sql_type}")
-    con.commit()
+
+
+def _pack_text(text: Optional[str]):
+    if text is None:
+        return None
+    raw = text.encode("utf-8")
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return text
+    return _CODEC_ZLIB + zlib.compress(raw, 6)
+
+
+def _unpack_text(value):
+    if isinstance(value, (bytes, memoryview)):
+        raw = bytes(value)
+        if raw.startswith(_CODEC_ZLIB):
+            raw = zlib.decompress(raw[len(_CODEC_ZLIB):])
+        return raw.decode("utf-8", errors="replace")
+    return value
+
+
+def _decode_row(row: sqlite3.Row) -> Dict[str, Any]:
+    d = dict(row)
+    for col in _COMPRESSED_COLUMNS:
+        if col in d:
+            d[col] = _unpack_text(d[col])
+    return d
+
+
+# -------------------------
+# Migrations (PRAGMA user_version = number of applied steps)
+# -------------------------
+def _m001_attempts(con: sqlite3.Connection):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS attempts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at TEXT NOT NULL,
+        user_email TEXT NOT NULL,
+        mode TEXT NOT NULL,              -- 'training' | 'exam'
+        level TEXT NOT NULL,             -- easy|medium|hard
+        transcript TEXT NOT NULL,
+        score INTEGER,                   -- nullable for training
+        passed INTEGER,                  -- 0/1 nullable for training
+        summary TEXT,
+        strengths TEXT,                  -- JSON string
+        improvements TEXT,               -- JSON string
+        checklist_score INTEGER,          -- 0-100, nullable
+        checklist_json TEXT,              -- JSON string (items/evidence)
+        customer_type TEXT,               -- optional
+        emotion_level INTEGER             -- optional
+    )
+    """)
+    # Databases created before user_version tracking may lack the newer columns
+    _ensure_columns(con)
+
+
+def _m002_attempt_indexes(con: sqlite3.Connection):
+    # Every admin filter ends in id so keyset pages (id < cursor ORDER BY id DESC) are index range scans
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user_id ON attempts(user_email, id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attempts_mode_level_id ON attempts(mode, level, id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attempts_level_id ON attempts(level, id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attempts_mode_passed_id ON attempts(mode, passed, id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attempts_created_id ON attempts(created_at, id)")
+
+
+def _m003_compress_large_columns(con: sqlite3.Connection):
+    last_id = 0
+    while True:
+        rows = con.execute("""
+            SELECT id, transcript, checklist_json FROM attempts
+            WHERE id > ? AND (typeof(transcript) = 'text' OR typeof(checklist_json) = 'text')
+            ORDER BY id LIMIT 500
+        """, (last_id,)).fetchall()
+        if not rows:
+            return
+        con.executemany(
+            "UPDATE attempts SET transcript = ?, checklist_json = ? WHERE id = ?",
+            [(_pack_text(_unpack_text(r["transcript"])), _pack_text(_unpack_text(r["checklist_json"])), r["id"])
+             for r in rows],
+        )
+        last_id = rows[-1]["id"]
+
+
+def _m004_calls_and_turns(con: sqlite3.Connection):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS calls (
+        call_id TEXT PRIMARY KEY,
+        user_email TEXT NOT NULL,
+        level TEXT NOT NULL,
+        scenario_id TEXT,
+        created_at TEXT NOT NULL,
+        attempt_id INTEGER               -- set when the call is finished
+    )
+    """)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS attempt_turns (
+        call_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,            -- 0-based, assigned by the live page
+        role TEXT NOT NULL,              -- 'AGENT' | 'CUSTOMER'
+        text TEXT NOT NULL,
+        spoken_at TEXT,                  -- client clock, when the turn was finalized
+        received_at TEXT NOT NULL,       -- server clock
+        PRIMARY KEY (call_id, seq)
+    ) WITHOUT ROWID
+    """)
+    # Attempts finished from a call keep transcript = '' and are rebuilt from attempt_turns
+    con.execute("ALTER TABLE attempts ADD COLUMN call_id TEXT")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attempts_call_id ON attempts(call_id)")
+
+
+_STATS_COLUMNS = """
+        attempts INTEGER NOT NULL DEFAULT 0,
+        graded INTEGER NOT NULL DEFAULT 0,          -- attempts with a pass/fail result
+        passed INTEGER NOT NULL DEFAULT 0,
+        score_n INTEGER NOT NULL DEFAULT 0,
+        score_sum INTEGER NOT NULL DEFAULT 0,
+        checklist_n INTEGER NOT NULL DEFAULT 0,
+        checklist_sum INTEGER NOT NULL DEFAULT 0,
+        last_attempt_at TEXT
+"""
+
+_STATS_SELECT = """
+        COUNT(*),
+        COUNT(passed),
+        COALESCE(SUM(passed), 0),
+        COUNT(score),
+        COALESCE(SUM(score), 0),
+        COUNT(checklist_score),
+        COALESCE(SUM(checklist_score), 0),
+        MAX(created_at)
+"""
+
+
+def _m005_attempt_stats(con: sqlite3.Connection):
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS attempt_stats_trainee (
+        user_email TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        level TEXT NOT NULL,
+        {_STATS_COLUMNS},
+        PRIMARY KEY (user_email, mode, level)
+    ) WITHOUT ROWID
+    """)
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS attempt_stats_daily (
+        day TEXT NOT NULL,                          -- YYYY-MM-DD (UTC)
+        mode TEXT NOT NULL,
+        level TEXT NOT NULL,
+        {_STATS_COLUMNS},
+        PRIMARY KEY (day, mode, level)
+    ) WITHOUT ROWID
+    """)
+    # Backfill from history; from here on save_attempt keeps them current
+    con.execute(f"""
+        INSERT OR REPLACE INTO attempt_stats_trainee
+        SELECT user_email, mode, level, {_STATS_SELECT}
+        FROM attempts GROUP BY user_email, mode, level
+    """)
+    con.execute(f"""
+        INSERT OR REPLACE INTO attempt_stats_daily
+        SELECT substr(created_at, 1, 10), mode, level, {_STATS_SELECT}
+        FROM attempts GROUP BY substr(created_at, 1, 10), mode, level
+    """)
+
+
+def _m006_attempts_fts(con: sqlite3.Connection):
+    # rowid = attempts.id; keeps its own (uncompressed) copy so snippet() works
+    con.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS attempts_fts USING fts5(
+        transcript,
+        evidence,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """)
+    _rebuild_fts(con)
+
+
+def _m007_attempt_status(con: sqlite3.Connection):
+    # pending => saved at finish, evaluation still running (see jobs.py); error => evaluation failed
+    con.execute("ALTER TABLE attempts ADD COLUMN status TEXT NOT NULL DEFAULT 'done'")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attempts_unfinished ON attempts(status) WHERE status != 'done'")
+
+
+def _m008_evaluation_runs(con: sqlite3.Connection):
+    # Batch re-grading (manage.py regrade): results are versioned per run, attempts stay untouched.
+    # attempt_evaluations doubles as the checkpoint: rows start 'pending' and are resumed by run_id.
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS evaluation_runs (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        label TEXT NOT NULL DEFAULT '',
+        rubric_version TEXT NOT NULL,
+        grader_model TEXT NOT NULL,
+        filters_json TEXT NOT NULL DEFAULT '{}',
+        total INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        finished_at TEXT
+    )
+    """)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS attempt_evaluations (
+        run_id INTEGER NOT NULL,
+        attempt_id INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',     -- pending | done | error
+        score INTEGER,
+        passed INTEGER,
+        summary TEXT,
+        strengths TEXT,
+        improvements TEXT,
+        checklist_score INTEGER,
+        checklist_json TEXT,
+        error TEXT,
+        evaluated_at TEXT,
+        PRIMARY KEY (run_id, attempt_id)
+    ) WITHOUT ROWID
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attempt_evaluations_attempt ON attempt_evaluations(attempt_id, run_id)")
+
+
+def _m009_evaluation_claims(con: sqlite3.Connection):
+    # Lease on a pending evaluation so only one worker process runs it (see claim_attempt)
+    con.execute("ALTER TABLE attempts ADD COLUMN claimed_by TEXT")
+    con.execute("ALTER TABLE attempts ADD COLUMN claimed_until REAL")
+
+
+_MIGRATIONS = [
+    _m001_attempts,
+    _m002_attempt_indexes,
+    _m003_compress_large_columns,
+    _m004_calls_and_turns,
+    _m005_attempt_stats,
+    _m006_attempts_fts,
+    _m007_attempt_status,
+    _m008_evaluation_runs,
+    _m009_evaluation_claims,
+]
+SCHEMA_VERSION = len(_MIGRATIONS)
+
 
 def init_db():
-    with _conn() as con:
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS attempts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            created_at TEXT NOT NULL,
-            user_email TEXT NOT NULL,
-            mode TEXT NOT NULL,              -- 'training' | 'exam'
-            level TEXT NOT NULL,             -- easy|medium|hard
-            transcript TEXT NOT NULL,
-            score INTEGER,                   -- nullable for training
-            passed INTEGER,                  -- 0/1 nullable for training
-            summary TEXT,
-            strengths TEXT,                  -- JSON string
-            improvements TEXT,               -- JSON string
-            checklist_score INTEGER,          -- 0-100, nullable
-            checklist_json TEXT,              -- JSON string (items/evidence)
-            customer_type TEXT,               -- optional
-            emotion_level INTEGER             -- optional
+    """Applies pending migrations once per process. Cheap no-op after the first call."""
+    global _ready
+    if _ready:
+        return
+    with _init_lock:
+        if _ready:
+            return
+        con = _connect(isolation_level=None)
+        try:
+            # IMMEDIATE: a second process starting at the same time waits, then sees the new version
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                version = con.execute("PRAGMA user_version").fetchone()[0]
+                for step in range(version, SCHEMA_VERSION):
+                    _MIGRATIONS[step](con)
+                    con.execute(f"PRAGMA user_version = {step + 1}")
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+        finally:
+            con.close()
+        _ready = True
+
+def _attempt_row(a: Dict[str, Any]) -> tuple:
+    created_at = a.get("created_at") or datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    return (
+        created_at,
+        a["user_email"],
+        a["mode"],
+        a.get("level", "easy"),
+        _pack_text(a.get("transcript", "")),
+        a.get("score", None),
+        a.get("passed", None),
+        a.get("summary", ""),
+        a.get("strengths", ""),
+        a.get("improvements", ""),
+        a.get("checklist_score", None),
+        _pack_text(a.get("checklist_json", "")),
+        a.get("customer_type", ""),
+        a.get("emotion_level", None),
+        a.get("call_id", None),
+        a.get("status", "done"),
+    )
+
+
+def _insert_attempt(con: sqlite3.Connection, a: Dict[str, Any], row: tuple) -> int:
+    cur = con.execute("""
+        INSERT INTO attempts(
+            created_at,user_email,mode,level,transcript,
+            score,passed,summary,strengths,improvements,
+            checklist_score,checklist_json,customer_type,emotion_level,call_id,status
         )
-        """)
-        _ensure_columns(con)
+        VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """, row)
+    attempt_id = int(cur.lastrowid)
+    if a.get("call_id"):
+        con.execute("UPDATE calls SET attempt_id = ? WHERE call_id = ?", (attempt_id, a["call_id"]))
+    # Pending attempts enter the aggregates once evaluated (complete_attempt)
+    if row[-1] == "done":
+        _bump_stats(con, row)
+    _index_attempt(con, attempt_id, a.get("transcript", ""), a.get("call_id"), a.get("checklist_json", ""))
+    return attempt_id
+
+
+_STATS_UPSERT = """
+    INSERT INTO {table}({key}, attempts, graded, passed, score_n, score_sum,
+                        checklist_n, checklist_sum, last_attempt_at)
+    VALUES(?,?,?,1,?,?,?,?,?,?,?)
+    ON CONFLICT({key}) DO UPDATE SET
+        attempts = attempts + 1,
+        graded = graded + excluded.graded,
+        passed = passed + excluded.passed,
+        score_n = score_n + excluded.score_n,
+        score_sum = score_sum + excluded.score_sum,
+        checklist_n = checklist_n + excluded.checklist_n,
+        checklist_sum = checklist_sum + excluded.checklist_sum,
+        last_attempt_at = MAX(COALESCE(last_attempt_at, ''), excluded.last_attempt_at)
+"""
+
+
+def _bump_stats(con: sqlite3.Connection, row: tuple):
+    """Adds one attempt (an _attempt_row tuple) to the aggregate tables, inside the caller's transaction."""
+    created_at, user_email, mode, level = row[0], row[1], row[2], row[3]
+    score, passed, checklist_score = row[5], row[6], row[10]
+    counts = (
+        0 if passed is None else 1,
+        1 if passed else 0,
+        0 if score is None else 1,
+        int(score or 0),
+        0 if checklist_score is None else 1,
+        int(checklist_score or 0),
+        created_at,
+    )
+    con.execute(_STATS_UPSERT.format(table="attempt_stats_trainee", key="user_email, mode, level"),
+                (user_email, mode, level, *counts))
+    con.execute(_STATS_UPSERT.format(table="attempt_stats_daily", key="day, mode, level"),
+                (created_at[:10], mode, level, *counts))
+
+
+# -------------------------
+# Write-behind queue: concurrent saves share one transaction (group commit)
+# -------------------------
+WRITE_BATCH_MAX = int(os.getenv("APP_DB_WRITE_BATCH_MAX", "64"))
+WRITE_WINDOW_MS = float(os.getenv("APP_DB_WRITE_WINDOW_MS", "2"))
+
+
+class _AttemptWriter:
+    """
+    One background thread owns attempt inserts. Each save waits on a Future that is
+    resolved only after its batch has committed, so callers keep the same durability
+    as a direct INSERT + COMMIT while the writer lock is taken once per batch.
+    """
+
+    def __init__(self):
+        self._q: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "failed_batches": 0,
+            "max_batch": 0,
+            "commit_ms_sum": 0.0,
+            "commit_ms_max": 0.0,
+            "commit_ms_last": 0.0,
+            "batch_size_hist": {"1": 0, "2-4": 0, "5-16": 0, "17+": 0},
+        }
+
+    def submit(self, a: Dict[str, Any]) -> Future:
+        fut: Future = Future()
+        try:
+            row = _attempt_row(a)
+        except Exception as e:
+            fut.set_exception(e)
+            return fut
+        self._ensure_thread()
+        self._q.put((a, row, fut))
+        return fut
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Drains queued saves, then stops the thread (app shutdown)."""
+        t = self._thread
+        if t is None or not t.is_alive():
+            return
+        self._q.put(None)
+        t.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + WRITE_WINDOW_MS / 1000.0
+            stop = False
+            while len(batch) < WRITE_BATCH_MAX:
+                wait = deadline - time.monotonic()
+                try:
+                    nxt = self._q.get(timeout=wait) if wait > 0 else self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: list):
+        t0 = time.perf_counter()
+        try:
+            with _conn() as con:
+                ids = [_insert_attempt(con, a, row) for a, row, _ in batch]
+        except Exception as e:
+            with self._stats_lock:
+                self._stats["failed_batches"] += 1
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            # The batch was rolled back: redo each save alone so only the bad one fails
+            for item in batch:
+                self._commit([item])
+            return
+        ms = (time.perf_counter() - t0) * 1000.0
+        self._record(len(batch), ms)
+        for (_, _, fut), attempt_id in zip(batch, ids):
+            fut.set_result(attempt_id)
+
+    def _record(self, n: int, ms: float):
+        bucket = "1" if n == 1 else ("2-4" if n <= 4 else ("5-16" if n <= 16 else "17+"))
+        with self._stats_lock:
+            st = self._stats
+            st["batches"] += 1
+            st["items"] += n
+            st["max_batch"] = max(st["max_batch"], n)
+            st["commit_ms_sum"] += ms
+            st["commit_ms_max"] = max(st["commit_ms_max"], ms)
+            st["commit_ms_last"] = ms
+            st["batch_size_hist"][bucket] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            st = dict(self._stats)
+            st["batch_size_hist"] = dict(self._stats["batch_size_hist"])
+        batches = st["batches"]
+        return {
+            "queue_depth": self._q.qsize(),
+            "batches": batches,
+            "items": st["items"],
+            "failed_batches": st["failed_batches"],
+            "avg_batch": round(st["items"] / batches, 2) if batches else 0.0,
+            "max_batch": st["max_batch"],
+            "batch_size_hist": st["batch_size_hist"],
+            "commit_ms_avg": round(st["commit_ms_sum"] / batches, 3) if batches else 0.0,
+            "commit_ms_max": round(st["commit_ms_max"], 3),
+            "commit_ms_last": round(st["commit_ms_last"], 3),
+        }
+
+
+_writer = _AttemptWriter()
+
 
 def save_attempt(a: Dict[str, Any]) -> int:
-    init_db()
-    created_at = a.get("created_at") or datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    """Blocks until the attempt is committed; returns its id."""
+    return _writer.submit(a).result()
+
+
+async def asave_attempt(a: Dict[str, Any]) -> int:
+    """save_attempt for async handlers: waits for the group commit without blocking the loop."""
+    return await asyncio.wrap_future(_writer.submit(a))
+
+
+def stop_writer():
+    _writer.stop()
+
+
+def write_metrics() -> Dict[str, Any]:
+    return _writer.metrics()
+
+
+# -------------------------
+# Pending evaluations (finish returns at once; jobs.py fills the results in)
+# -------------------------
+_RESULT_FIELDS = ("score", "passed", "summary", "strengths", "improvements", "checklist_score", "checklist_json")
+
+
+def complete_attempt(attempt_id: int, result: Dict[str, Any]) -> bool:
+    """
+    Stores the evaluation of a pending attempt and adds it to the aggregates and the search
+    index. Returns False if the attempt was not pending (already completed elsewhere).
+    """
+    values = {f: result.get(f) for f in _RESULT_FIELDS}
+    values["checklist_json"] = _pack_text(values["checklist_json"] or "")
+    with _conn() as con:
+        cur = con.execute(f"""
+            UPDATE attempts SET {", ".join(f"{f} = ?" for f in _RESULT_FIELDS)}, status = 'done'
+            WHERE id = ? AND status = 'pending'
+        """, (*values.values(), attempt_id))
+        if cur.rowcount == 0:
+            return False
+        row = con.execute(
+            f"SELECT {', '.join(ATTEMPT_FIELDS)} FROM attempts WHERE id = ?", (attempt_id,)
+        ).fetchone()
+        # Past id the columns line up with _attempt_row; the stats never read the packed ones
+        _bump_stats(con, tuple(row)[1:])
+        _index_attempt(con, attempt_id, _unpack_text(row["transcript"]), row["call_id"],
+                       result.get("checklist_json") or "")
+    return True
+
+
+def fail_attempt(attempt_id: int, detail: str):
+    with _conn() as con:
+        con.execute(
+            "UPDATE attempts SET status = 'error', summary = ? WHERE id = ? AND status = 'pending'",
+            ((detail or "Evaluation failed")[:500], attempt_id),
+        )
+
+
+def claim_attempt(attempt_id: int, owner: str, lease_s: float) -> bool:
+    """
+    Takes (or renews) the lease on a pending attempt for owner. False if it is no longer
+    pending or another worker holds an unexpired lease.
+    """
+    now = time.time()
     with _conn() as con:
         cur = con.execute("""
-            INSERT INTO attempts(
-                created_at,user_email,mode,level,transcript,
-                score,passed,summary,strengths,improvements,
-                checklist_score,checklist_json,customer_type,emotion_level
-            )
-            VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-        """, (
-            created_at,
-            a["user_email"],
-            a["mode"],
-            a.get("level", "easy"),
-            a.get("transcript", ""),
-            a.get("score", None),
-            a.get("passed", None),
-            a.get("summary", ""),
-            a.get("strengths", ""),
-            a.get("improvements", ""),
-            a.get("checklist_score", None),
-            a.get("checklist_json", ""),
-            a.get("customer_type", ""),
-            a.get("emotion_level", None),
-        ))
-        con.commit()
-        return int(cur.lastrowid)
+            UPDATE attempts SET claimed_by = ?, claimed_until = ?
+            WHERE id = ? AND status = 'pending'
+              AND (claimed_by IS NULL OR claimed_by = ? OR claimed_until < ?)
+        """, (owner, now + lease_s, attempt_id, owner, now))
+        return cur.rowcount == 1
 
-def list_attempts(limit: int = 200) -> List[Dict[str, Any]]:
-    init_db()
+
+def release_attempt(attempt_id: int, owner: str):
+    """Drops owner's lease (shutdown), so the next worker to look resumes it at once."""
+    with _conn() as con:
+        con.execute(
+            "UPDATE attempts SET claimed_by = NULL, claimed_until = NULL WHERE id = ? AND claimed_by = ?",
+            (attempt_id, owner),
+        )
+
+
+def reset_failed_attempt(attempt_id: int) -> bool:
+    """error -> pending, for a re-evaluation. False if the attempt is not in error."""
+    with _conn() as con:
+        cur = con.execute("""
+            UPDATE attempts SET status = 'pending', summary = '', claimed_by = NULL, claimed_until = NULL
+            WHERE id = ? AND status = 'error'
+        """, (attempt_id,))
+        return cur.rowcount == 1
+
+
+def pending_attempt_ids() -> List[int]:
+    """Pending attempts no worker holds a live lease on."""
     with _conn() as con:
         rows = con.execute("""
+            SELECT id FROM attempts
+            WHERE status = 'pending' AND (claimed_until IS NULL OR claimed_until < ?)
+            ORDER BY id
+        """, (time.time(),)).fetchall()
+    return [int(r["id"]) for r in rows]
+
+
+def _attempt_filters(
+    user_email: Optional[str] = None,
+    mode: Optional[str] = None,
+    level: Optional[str] = None,
+    passed: Optional[bool] = None,
+    created_from: Optional[str] = None,
+    created_before: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Returns (where_sql, params). Date bounds compare created_at itself (idx_attempts_created_id):
+    ids are not in created_at order across workers and the group-commit writer.
+    """
+    where: List[str] = []
+    params: List[Any] = []
+    if user_email:
+        where.append("user_email = ?")
+        params.append(user_email.strip().lower())
+    if mode:
+        where.append("mode = ?")
+        params.append(mode)
+    if level:
+        where.append("level = ?")
+        params.append(level)
+    if passed is not None:
+        where.append("passed = ?")
+        params.append(1 if passed else 0)
+    if created_from:
+        where.append("created_at >= ?")
+        params.append(created_from)
+    if created_before:
+        where.append("created_at < ?")
+        params.append(created_before)
+    return (" AND ".join(where) or "1=1"), params
+
+
+def list_attempts(
+    limit: int = 200,
+    cursor: Optional[int] = None,
+    user_email: Optional[str] = None,
+    mode: Optional[str] = None,
+    level: Optional[str] = None,
+    passed: Optional[bool] = None,
+    created_from: Optional[str] = None,
+    created_before: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Newest first. Keyset pagination: pass the last id of the previous page as cursor.
+    created_from is inclusive, created_before exclusive (ISO strings, compared as text).
+    A date range is walked in (created_at, id) order, id only breaking ties.
+    """
+    where, params = _attempt_filters(user_email, mode, level, passed, created_from, created_before)
+    dated = bool(created_from or created_before)
+    with _conn() as con:
+        if cursor is not None:
+            if dated:
+                where += " AND (created_at, id) < (SELECT created_at, id FROM attempts WHERE id = ?)"
+            else:
+                where += " AND id < ?"
+            params.append(int(cursor))
+        rows = con.execute(f"""
             SELECT id, created_at, user_email, mode, level,
                    score, passed, checklist_score
             FROM attempts
-            ORDER BY id DESC
+            WHERE {where}
+            ORDER BY {"created_at DESC, id DESC" if dated else "id DESC"}
             LIMIT ?
-        """, (limit,)).fetchall()
+        """, (*params, int(limit))).fetchall()
     return [dict(r) for r in rows]
 
-def get_attempt(attempt_id: int) -> Optional[Dict[str, Any]]:
+def iter_attempts(
+    user_email: Optional[str] = None,
+    mode: Optional[str] = None,
+    level: Optional[str] = None,
+    passed: Optional[bool] = None,
+    created_from: Optional[str] = None,
+    created_before: Optional[str] = None,
+    include_transcript: bool = False,
+    batch_size: int = 500,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams matching attempts (oldest first) from one server-side cursor, batch_size rows at a time.
+    Uses its own connection so a long export never holds a pooled one.
+    """
     init_db()
+    fields = ATTEMPT_FIELDS if include_transcript else REPORT_FIELDS
+    where, params = _attempt_filters(user_email, mode, level, passed, created_from, created_before)
+    con = _connect()
+    try:
+        cur = con.execute(f"""
+            SELECT {", ".join(fields)}
+            FROM attempts
+            WHERE {where}
+            ORDER BY {"created_at, id" if created_from or created_before else "id"}
+        """, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            for r in rows:
+                a = _decode_row(r)
+                if include_transcript and not a["transcript"] and a.get("call_id"):
+                    a["transcript"] = render_transcript(_list_turns(con, a["call_id"]))
+                yield a
+    finally:
+        con.close()
+
+
+def get_attempt(attempt_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    fields: optional projection (see ATTEMPT_FIELDS). Columns not selected are neither
+    read nor decompressed, so summaries and reports skip the transcript entirely.
+    """
+    if fields is None:
+        cols = "*"
+    else:
+        unknown = [f for f in fields if f not in ATTEMPT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown attempt fields: {', '.join(unknown)}")
+        extra = ["call_id"] if "transcript" in fields else []
+        cols = ", ".join(dict.fromkeys(["id", *fields, *extra]))
     with _conn() as con:
-        row = con.execute("""
-            SELECT *
+        row = con.execute(f"""
+            SELECT {cols}
             FROM attempts
             WHERE id = ?
         """, (attempt_id,)).fetchone()
+        if not row:
+            return None
+        a = _decode_row(row)
+        if "transcript" in a and not a["transcript"] and a.get("call_id"):
+            a["transcript"] = render_transcript(_list_turns(con, a["call_id"]))
+    return a
+
+
+# -------------------------
+# Calls + turns (streamed from the live page while the call runs)
+# -------------------------
+TURN_ROLES = ("AGENT", "CUSTOMER")
+
+
+def create_call(user_email: str, level: str, scenario_id: str = "") -> str:
+    call_id = uuid.uuid4().hex
+    created_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    with _conn() as con:
+        con.execute("""
+            INSERT INTO calls(call_id, user_email, level, scenario_id, created_at)
+            VALUES(?,?,?,?,?)
+        """, (call_id, user_email, level, scenario_id or "", created_at))
+    return call_id
+
+
+def get_call(call_id: str) -> Optional[Dict[str, Any]]:
+    with _conn() as con:
+        row = con.execute("SELECT * FROM calls WHERE call_id = ?", (call_id,)).fetchone()
     return dict(row) if row else None
+
+
+def append_turns(call_id: str, turns: List[Dict[str, Any]]) -> int:
+    """
+    Idempotent: re-sent turns (same seq) are ignored, so the page can simply retry.
+    Returns the highest seq stored for the call (-1 if none).
+    """
+    received_at = datetime.utcnow().isoformat(timespec="milliseconds") + "Z"
+    with _conn() as con:
+        con.executemany("""
+            INSERT OR IGNORE INTO attempt_turns(call_id, seq, role, text, spoken_at, received_at)
+            VALUES(?,?,?,?,?,?)
+        """, [
+            (call_id, int(t["seq"]), t["role"], t["text"], t.get("spoken_at"), received_at)
+            for t in turns
+        ])
+        row = con.execute("SELECT MAX(seq) AS m FROM attempt_turns WHERE call_id = ?", (call_id,)).fetchone()
+    return -1 if row["m"] is None else int(row["m"])
+
+
+def _list_turns(con: sqlite3.Connection, call_id: str, after_seq: int = -1) -> List[Dict[str, Any]]:
+    rows = con.execute("""
+        SELECT seq, role, text, spoken_at, received_at
+        FROM attempt_turns
+        WHERE call_id = ? AND seq > ?
+        ORDER BY seq
+    """, (call_id, after_seq)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def list_turns(call_id: str, after_seq: int = -1) -> List[Dict[str, Any]]:
+    with _conn() as con:
+        return _list_turns(con, call_id, after_seq)
+
+
+def render_transcript(turns: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"{t['role']}: {t['text']}" for t in turns).strip()
+
+
+# -------------------------
+# Batch re-grading runs (see regrade.py)
+# -------------------------
+def create_evaluation_run(
+    rubric_version: str, grader_model: str, label: str = "", filters: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Snapshots the matching evaluated attempts as the run's pending work list."""
+    filters = {k: v for k, v in (filters or {}).items() if v is not None}
+    created_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    with _conn() as con:
+        cur = con.execute("""
+            INSERT INTO evaluation_runs(label, rubric_version, grader_model, filters_json, created_at)
+            VALUES(?,?,?,?,?)
+        """, (label, rubric_version, grader_model, json.dumps(filters, sort_keys=True), created_at))
+        run_id = int(cur.lastrowid)
+        where, params = _attempt_filters(**filters)
+        total = con.execute(f"""
+            INSERT INTO attempt_evaluations(run_id, attempt_id)
+            SELECT ?, id FROM attempts WHERE {where} AND status = 'done' ORDER BY id
+        """, (run_id, *params)).rowcount
+        con.execute("UPDATE evaluation_runs SET total = ? WHERE run_id = ?", (total, run_id))
+    return get_evaluation_run(run_id)
+
+
+def get_evaluation_run(run_id: int) -> Optional[Dict[str, Any]]:
+    with _conn() as con:
+        row = con.execute("SELECT * FROM evaluation_runs WHERE run_id = ?", (run_id,)).fetchone()
+        if not row:
+            return None
+        run = dict(row)
+        counts = con.execute("""
+            SELECT status, COUNT(*) AS n FROM attempt_evaluations WHERE run_id = ? GROUP BY status
+        """, (run_id,)).fetchall()
+    run["progress"] = {"pending": 0, "done": 0, "error": 0, **{r["status"]: r["n"] for r in counts}}
+    return run
+
+
+def list_evaluation_runs(limit: int = 50) -> List[Dict[str, Any]]:
+    with _conn() as con:
+        ids = [r["run_id"] for r in con.execute(
+            "SELECT run_id FROM evaluation_runs ORDER BY run_id DESC LIMIT ?", (limit,)
+        ).fetchall()]
+    return [get_evaluation_run(i) for i in ids]
+
+
+def run_work_items(run_id: int, retry_errors: bool = False) -> List[int]:
+    """Attempt ids still to evaluate in a run (the resume point after a crash)."""
+    statuses = ("pending", "error") if retry_errors else ("pending",)
+    with _conn() as con:
+        rows = con.execute(f"""
+            SELECT attempt_id FROM attempt_evaluations
+            WHERE run_id = ? AND status IN ({",".join("?" * len(statuses))})
+            ORDER BY attempt_id
+        """, (run_id, *statuses)).fetchall()
+    return [int(r["attempt_id"]) for r in rows]
+
+
+def save_run_result(run_id: int, attempt_id: int, result: Optional[Dict[str, Any]] = None, error: str = ""):
+    evaluated_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    r = result or {}
+    with _conn() as con:
+        con.execute("""
+            UPDATE attempt_evaluations SET
+                status = ?, score = ?, passed = ?, summary = ?, strengths = ?, improvements = ?,
+                checklist_score = ?, checklist_json = ?, error = ?, evaluated_at = ?
+            WHERE run_id = ? AND attempt_id = ?
+        """, (
+            "error" if error else "done",
+            r.get("score"), r.get("passed"), r.get("summary"), r.get("strengths"), r.get("improvements"),
+            r.get("checklist_score"), _pack_text(r.get("checklist_json")), error or None, evaluated_at,
+            run_id, attempt_id,
+        ))
+
+
+def finish_evaluation_run(run_id: int):
+    finished_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    with _conn() as con:
+        con.execute("""
+            UPDATE evaluation_runs SET finished_at = ?
+            WHERE run_id = ? AND NOT EXISTS (
+                SELECT 1 FROM attempt_evaluations WHERE run_id = ? AND status = 'pending'
+            )
+        """, (finished_at, run_id, run_id))
+
+
+# -------------------------
+# Aggregates (O(1) reads per key; maintained by save_attempt)
+# -------------------------
+def _stats_out(r: sqlite3.Row) -> Dict[str, Any]:
+    d = dict(r)
+    d["pass_rate"] = round(d["passed"] / d["graded"], 4) if d["graded"] else None
+    d["avg_score"] = round(d["score_sum"] / d["score_n"], 2) if d["score_n"] else None
+    d["avg_checklist_score"] = round(d["checklist_sum"] / d["checklist_n"], 2) if d["checklist_n"] else None
+    return d
+
+
+def trainee_stats(
+    user_email: Optional[str] = None,
+    mode: Optional[str] = None,
+    level: Optional[str] = None,
+    limit: int = 500,
+) -> List[Dict[str, Any]]:
+    where, params = ["1=1"], []
+    for col, val in (("user_email", (user_email or "").strip().lower()), ("mode", mode), ("level", level)):
+        if val:
+            where.append(f"{col} = ?")
+            params.append(val)
+    with _conn() as con:
+        rows = con.execute(f"""
+            SELECT * FROM attempt_stats_trainee
+            WHERE {" AND ".join(where)}
+            ORDER BY user_email, mode, level
+            LIMIT ?
+        """, (*params, int(limit))).fetchall()
+    return [_stats_out(r) for r in rows]
+
+
+def daily_stats(
+    day_from: Optional[str] = None,
+    day_to: Optional[str] = None,
+    mode: Optional[str] = None,
+    level: Optional[str] = None,
+    limit: int = 366,
+) -> List[Dict[str, Any]]:
+    """day_from / day_to: inclusive YYYY-MM-DD bounds."""
+    where, params = ["1=1"], []
+    if day_from:
+        where.append("day >= ?")
+        params.append(day_from[:10])
+    if day_to:
+        where.append("day <= ?")
+        params.append(day_to[:10])
+    for col, val in (("mode", mode), ("level", level)):
+        if val:
+            where.append(f"{col} = ?")
+            params.append(val)
+    with _conn() as con:
+        rows = con.execute(f"""
+            SELECT * FROM attempt_stats_daily
+            WHERE {" AND ".join(where)}
+            ORDER BY day DESC, mode, level
+            LIMIT ?
+        """, (*params, int(limit))).fetchall()
+    return [_stats_out(r) for r in rows]
+
+
+# -------------------------
+# Full-text search (attempts_fts, kept in sync by _insert_attempt)
+# -------------------------
+SNIPPET_OPEN = "\x02"
+SNIPPET_CLOSE = "\x03"
+SEARCH_MAX_OFFSET = 1000
+
+
+def _checklist_evidence(checklist_json: Optional[str]) -> str:
+    try:
+        data = json.loads(checklist_json or "")
+    except Exception:
+        return ""
+    items = data.get("items") if isinstance(data, dict) else None
+    lines = []
+    for it in items or []:
+        if isinstance(it, dict) and it.get("evidence"):
+            lines.append(f"{it.get('id') or ''}: {it['evidence']}")
+    return "\n".join(lines)
+
+
+def _index_attempt(con: sqlite3.Connection, attempt_id: int, transcript: str, call_id: Optional[str], checklist_json: str):
+    if not transcript and call_id:
+        transcript = render_transcript(_list_turns(con, call_id))
+    con.execute("DELETE FROM attempts_fts WHERE rowid = ?", (attempt_id,))
+    con.execute(
+        "INSERT INTO attempts_fts(rowid, transcript, evidence) VALUES(?,?,?)",
+        (attempt_id, transcript or "", _checklist_evidence(checklist_json)),
+    )
+
+
+def _rebuild_fts(con: sqlite3.Connection) -> int:
+    con.execute("DELETE FROM attempts_fts")
+    last_id, n = 0, 0
+    while True:
+        rows = con.execute("""
+            SELECT id, transcript, checklist_json, call_id FROM attempts
+            WHERE id > ? ORDER BY id LIMIT 500
+        """, (last_id,)).fetchall()
+        if not rows:
+            return n
+        for r in rows:
+            d = _decode_row(r)
+            _index_attempt(con, d["id"], d["transcript"], d["call_id"], d["checklist_json"])
+        n += len(rows)
+        last_id = rows[-1]["id"]
+
+
+def rebuild_search_index() -> int:
+    """Re-indexes every attempt (manage.py rebuild-fts). Returns the number of rows indexed."""
+    with _conn() as con:
+        return _rebuild_fts(con)
+
+
+def _fts_phrase(q: str) -> str:
+    words = (q or "").replace('"', " ").split()
+    return '"' + " ".join(words) + '"' if words else ""
+
+
+def search_attempts(q: str, scope: str = "all", limit: int = 20, page: int = 0) -> List[Dict[str, Any]]:
+    """
+    Ranked (bm25) phrase search over transcripts and/or checklist evidence.
+    scope: all | transcript | evidence. Snippet matches are wrapped in SNIPPET_OPEN/SNIPPET_CLOSE.
+    """
+    phrase = _fts_phrase(q)
+    if not phrase:
+        return []
+    if scope in ("transcript", "evidence"):
+        phrase = f"{scope} : {phrase}"
+    offset = max(0, int(page)) * int(limit)
+    if offset > SEARCH_MAX_OFFSET:
+        return []  # deep pages are not served (bm25 ranks every match first); narrow the query
+    with _conn() as con:
+        rows = con.execute("""
+            SELECT a.id, a.created_at, a.user_email, a.mode, a.level,
+                   a.score, a.passed, a.checklist_score,
+                   snippet(attempts_fts, 0, ?, ?, '…', 14) AS transcript_snippet,
+                   snippet(attempts_fts, 1, ?, ?, '…', 14) AS evidence_snippet
+            FROM attempts_fts
+            JOIN attempts a ON a.id = attempts_fts.rowid
+            WHERE attempts_fts MATCH ?
+            ORDER BY bm25(attempts_fts)
+            LIMIT ? OFFSET ?
+        """, (SNIPPET_OPEN, SNIPPET_CLOSE, SNIPPET_OPEN, SNIPPET_CLOSE, phrase, int(limit), offset)).fetchall()
+    return [dict(r) for r in rows]